@@ -1,26 +1,51 @@
-import xml.etree.ElementTree as ET
-import pandas as pd
-import matplotlib.pyplot as plt
-from textwrap import wrap
+import os
+import sys
+import csv
+import json
+import math
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benford import cache, clarity, digits, histogram, instrument, permutation, reference, render, simulate, stats
 
 SHOW_PLOTS = True # Show interactive plot
+USE_CACHE = True # Reuse parsed detail.xml from .benford-cache/ until it changes
 SAVE_FIGS = False # Save jpg of plot
+RENDER_WORKERS = None # Processes used to save jpgs (None for all cores)
+FAST_RENDER = True # Reuse one headless figure per plot layout when saving jpgs
+RENDER_CACHE = True # Only redo jpgs whose plot changed since they were saved (spec hashes in .render-manifest.json)
 VOTETYPE_PLOTS = True # Show votetype plots (election day, mail, absentee, etc)
 EXTRA_PLOTS = False # Non-presidential plots (400+ plots!)
-FIRST_DIGIT_TEST = True # First digit or second digit Benford's law test
+GRID_PLOTS = None # Plot each contest as one grid of choice panels, and of choice by votetype panels: 'jpg', or 'pdf' for pages of panels
+PRINT_STATS = True # Print conformity statistics (chi-square, MAD, KS) of every choice and votetype
+COMPUTE_ONLY = False # Only count and print statistics, no plots, so pandas and matplotlib are never imported
+VOTE_TYPE_TEST = False # Permutation test of whether each choice's votetypes have different digit distributions
+PERMUTATION_DRAWS = 10000 # Permutations per pair of votetypes
+CONFIDENCE_BANDS = True # Draw 95% Monte Carlo bands for each plot's sample size, and print Monte Carlo p-values
+SIMULATION_DRAWS = 10000 # Simulated samples per sample size
+SIMULATION_WORKERS = None # Processes used for simulations (None for all cores)
+FIRST_DIGIT_TEST = True # First digit or second digit Benford's law test (run.py runs both)
+FINAL_DIGITS_TEST = False # Last 2 digits plots of each choice, and uniformity and repeated/adjacent pair stats of every choice and votetype
+TRIAGE = False # Score every contest, choice and votetype without plotting, write them ranked to TRIAGE_OUTPUT.csv/.json, and only plot the worst
+TRIAGE_TOP = 20 # Plot this many of the worst scores
+TRIAGE_THRESHOLD = None # Or plot every score with a MAD at least this large
+TRIAGE_MIN_SIZE = 30 # Rank groups with fewer counted values last, their MAD is mostly noise
+TRIAGE_OUTPUT = 'triage' # Path of the ranked tables without extension
+RUN_REPORT = None # Write stage timings, counters and peak memory of the run as json to this path
+PRECINCT_SOURCE = None # Directory or zip of per-county precinct level detail.xml exports, counts precincts instead of counties
+INGEST_WORKERS = None # Processes parsing precinct files (None for all cores)
+PROFILE_STAGE = None # cProfile one stage ('ingest', 'count', 'stats', 'plot' or 'render') and print its hot spots
 
-# Benford's law 1st digit test
-if FIRST_DIGIT_TEST:
-    S_BENFORDS = pd.Series(
-        [0.301, 0.176, 0.125, 0.097, 0.079, 0.067, 0.058, 0.051, 0.046],
-        index=range(1,10)
-    )
-# 2nd digit test
-else:
-    S_BENFORDS = pd.Series(
-        [0.12, 0.114, 0.109, 0.104, 0.1, 0.097, 0.093, 0.09, 0.088, 0.085],
-        index=range(0,10)
-    )
+def set_digit_test(first_digit_test):
+    # Digit test of all counts and plots below
+    global FIRST_DIGIT_TEST, DIGIT_TEST, BENFORDS, BENFORDS_INDEX
+    FIRST_DIGIT_TEST = first_digit_test
+    DIGIT_TEST = 'first' if first_digit_test else 'second'
+    # Benford's law expected proportions for the digit test
+    BENFORDS = reference.probabilities(DIGIT_TEST)
+    BENFORDS_INDEX = reference.index(DIGIT_TEST)
+
+set_digit_test(FIRST_DIGIT_TEST)
 
 def totals_to_percentages(leading_nums, length):
     totals = 0
@@ -28,29 +53,70 @@ def totals_to_percentages(leading_nums, length):
         totals = sum(leading_nums)
         if totals == 0:
             return None, None
-        s_leading_nums = pd.Series(
-            map(lambda x: x / totals, leading_nums),
-            index=range(1,10) if FIRST_DIGIT_TEST else range(0, 10)
-        )
+        s_leading_nums = np.asarray(leading_nums) / totals
     else:
         s_leading_nums = [None for _ in range(length)]
         # Convert nums to percentages
         for i in range(length):
             tot_nums = sum(leading_nums[i])
             totals += tot_nums
-            s_leading_nums[i] = pd.Series(
-                map(lambda x: x / tot_nums, leading_nums[i]),
-                index=range(1,10) if FIRST_DIGIT_TEST else range(0, 10)
-            )
+            s_leading_nums[i] = np.asarray(leading_nums[i]) / tot_nums
 
     return totals, s_leading_nums
 
-def set_bl_labels(p):
-    p.set_xlabel('{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'))
-    p.set_ylabel('Proportion')
-    p.legend(['Benford\'s law', 'Actual value'])
+def bl_labels(band=False):
+    return {
+        'xlabel': '{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'),
+        'ylabel': 'Proportion',
+        'legend': ['Benford\'s law', '95% band', 'Actual value'] if band else ['Benford\'s law', 'Actual value']
+    }
+
+def choice_color(choice):
+    if 'Dem' in choice:
+        return 'b'
+    elif 'Rep' in choice:
+        return 'r'
+    return 'g'
+
+def region_note():
+    return 'By Precinct' if PRECINCT_SOURCE else 'By County'
+
+def clean_title(title):
+    ## Remove illegal characters
+    for c in ('"', '/', '\\'):
+        title = title.replace(c, '')
+    return title
 
-def plot_benfords_law(leading_nums, contest, choice, total_count, note, dir, biden_v_trump=False, all_3=False):
+def plot_title(contest, choice, note, total_count, totals):
+    return clean_title('GA {} - {} ({}) Vote Count - {:,}, Size - {:,}'.format(contest, choice, note, int(total_count), int(totals)))
+
+def contest_grid(contest, note, dir, ncols=None):
+    # One grid per contest with a panel per choice (or choice and votetype) in place of their own jpgs
+    if not GRID_PLOTS:
+        return None
+    title = clean_title('GA {} ({})'.format(contest, note))
+    return render.grid_spec(
+        title,
+        path='{}/{}/Grids/{}.{}'.format(dir, '1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test', title, GRID_PLOTS),
+        ncols=ncols
+    )
+
+def plot_final_digits(final_nums, contest, choice, total_count, dir):
+    if COMPUTE_ONLY:
+        return
+    last, plast, _ = final_nums
+    title = plot_title(contest, choice, region_note(), total_count, last.sum()) + ' 2 Final Digits'
+    render.plot(render.final_digits_spec(
+        title,
+        last,
+        plast,
+        [choice_color(choice), 'c'],
+        path='{}/Final-Digits-Test/{}.jpg'.format(dir, title)
+    ), SAVE_FIGS)
+
+def plot_benfords_law(leading_nums, contest, choice, total_count, note, dir, biden_v_trump=False, all_3=False, grid=None):
+    if COMPUTE_ONLY:
+        return
     totals = 0
     if not biden_v_trump and not all_3:
         # Convert nums to percentages
@@ -63,162 +129,274 @@ def plot_benfords_law(leading_nums, contest, choice, total_count, note, dir, bid
         #     'Results': s_leading_nums,
         #     'Benford\'s Law': S_BENFORDS
         # })
-        if 'Dem' in choice:
-            color = 'b'
-        elif 'Rep' in choice:
-            color = 'r'
-        else:
-            color = 'g'
-        plt.figure()
-        leading_nums_plot = s_leading_nums.plot.bar(color=[color])
-        leading_nums_plot.plot(range(9 if FIRST_DIGIT_TEST else 10), S_BENFORDS, '.-', color='y', markerfacecolor='w', markeredgecolor='gray')
+        data = {'Actual value': s_leading_nums}
+        colors = [choice_color(choice)]
+        reference = BENFORDS
+        band = simulate.bands(totals, DIGIT_TEST, SIMULATION_DRAWS) if CONFIDENCE_BANDS else None
     elif biden_v_trump:
         # Convert nums to percentages
         totals, s_leading_nums = totals_to_percentages(leading_nums, 2)
 
-        df_leading_nums = pd.DataFrame({
+        data = {
             'Biden': s_leading_nums[0],
             'Trump': s_leading_nums[1],
-            'Benford\'s Law': S_BENFORDS
-        })
-        leading_nums_plot = df_leading_nums.plot.bar(color=['b', 'r', 'gray'])
+            'Benford\'s Law': BENFORDS
+        }
+        colors = ['b', 'r', 'gray']
+        reference = None
+        band = None
     elif all_3:
         # Convert nums to percentages
         totals, s_leading_nums = totals_to_percentages(leading_nums, 3)
 
-        df_leading_nums = pd.DataFrame({
+        data = {
             'Biden': s_leading_nums[0],
             'Trump': s_leading_nums[1],
             'Jorgensen': s_leading_nums[2],
-            'Benford\'s Law': S_BENFORDS
-        })
-        leading_nums_plot = df_leading_nums.plot.bar(color=['b', 'r', 'g', 'gray'])
+            'Benford\'s Law': BENFORDS
+        }
+        colors = ['b', 'r', 'g', 'gray']
+        reference = None
+        band = None
 
     # leading_nums_plot.plot(range(9), S_BENFORDS, color='gray')
-    title = 'GA {} - {} ({}) Vote Count - {:,}, Size - {:,}'.format(contest, choice, note, int(total_count), int(totals))
-    ## Remove illegal characters
-    for c in ('"', '/', '\\'):
-        title = title.replace(c, '')
-    leading_nums_plot.set_title('\n'.join(wrap(title, 60)))
-    set_bl_labels(leading_nums_plot)
-
-    if SAVE_FIGS:
-        n = '{}/{}/{}.jpg'.format(dir, '1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test', title)
-        plt.savefig(n)
-        print('Saved "{}"'.format(n))
-        plt.close()
-
-def generate_leading_numbers_arr():
-    return [0 for _ in range(9 if FIRST_DIGIT_TEST else 10)]
+    title = plot_title(contest, choice, note, total_count, totals)
+    if grid is not None:
+        # The grid is titled by the contest
+        title = '{} ({}) Vote Count - {:,}, Size - {:,}'.format(choice, note, int(total_count), int(totals))
+    render.plot(render.plot_spec(
+        title,
+        data,
+        BENFORDS_INDEX,
+        colors,
+        path='{}/{}/{}.jpg'.format(dir, '1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test', title),
+        reference=reference,
+        band=band,
+        **bl_labels(band is not None)
+    ), SAVE_FIGS, grid)
 
-def main():
+def load(stream=True):
+    if PRECINCT_SOURCE:
+        # Every county file is counted for all digit tests in a process pool, then merged
+        precincts = clarity.read_precincts(PRECINCT_SOURCE, digits.SCRIPT_TESTS, INGEST_WORKERS)
+        for h in precincts['hists'].values():
+            instrument.count('records_ingested', h['n'])
+            histogram.count_skipped(h)
+        return {'precincts': precincts}
     # detail.xml - https://results.enr.clarityelections.com/GA/105369/web.264614/#/summary
-    tree = ET.parse('detail.xml')
-    root = tree.getroot()
+    if USE_CACHE:
+        tables = cache.cached_tables('detail.xml', clarity.read_tables)
+    elif not stream:
+        tables = clarity.read_tables('detail.xml')
+    else:
+        # Stream Contests from detail.xml in run(), records are counted as they are parsed
+        return None
+    instrument.count('records_ingested', len(tables['detail']['columns']['votes']))
+    digits.count_skipped(tables['detail']['columns']['votes'])
+    return tables
+
+def counted(choices):
+    # Streamed choices, counting their records and skipped values as they are parsed
+    for contest, choice, total, vote_types in choices:
+        for votes in vote_types.values():
+            instrument.count('records_ingested', len(votes))
+            digits.count_skipped(votes)
+        yield contest, choice, total, vote_types
 
+def run(tables):
+    # Count, print and plot the loaded data with the current digit test
     # Count leading numbers for candidates
-    candidate_nums = {
-        'Biden': generate_leading_numbers_arr(),
-        'Trump': generate_leading_numbers_arr(),
-        'Jorgensen': generate_leading_numbers_arr()
-    }
+    tests = (DIGIT_TEST, 'last', 'plast', 'last_two') if FINAL_DIGITS_TEST else (DIGIT_TEST,)
+    candidate_hists = {n: histogram.empty(tests) for n in ('Biden', 'Trump', 'Jorgensen')}
     candidate_totals = {
         'Biden': None,
         'Trump': None,
         'Jorgensen': None
     }
 
-    # Iterate all children to build dictionary
-    votes = {}
-    for c in root:
-        # Find Contests
-        if c.tag != 'Contest' or (not EXTRA_PLOTS and c.attrib['text'] != 'President of the United States'):
-            continue
-        # Contest key
-        votes[c.attrib['text']] = {}
-
-        # Find Choice in Contest
-        for cc in c:
-            if cc.tag != 'Choice':
-                continue
-            # Choice key
-            votes[c.attrib['text']][cc.attrib['text']] = {}
+    contests = None if EXTRA_PLOTS else ['President of the United States']
+    if tables is not None and 'precincts' in tables:
+        choices = clarity.iter_precinct_choices(tables['precincts'], contests, tests)
+    elif tables is not None:
+        choices = clarity.iter_histogram_choices(clarity.iter_table_choices(tables['detail'], contests), tests)
+    else:
+        choices = clarity.iter_histogram_choices(counted(clarity.iter_choices('detail.xml', contests)), tests)
+    # Counts of every contest, choice and votetype for statistics
+    stats_names = []
+    stats_counts = []
+    final_counts = []
 
+    # Streamed Contests are parsed in this stage too
+    with instrument.stage('count'):
+        for contest, choice, choice_total, vote_types in choices:
             # Count leading numbers in each choice
-            leading_nums = generate_leading_numbers_arr()
-
-            # Find VoteType in Choice
-            for ccc in cc:
-                if ccc.tag != 'VoteType':
-                    continue
-                # VoteType key
-                votes[c.attrib['text']][cc.attrib['text']][ccc.attrib['name']] = {}
+            choice_hist = histogram.empty(tests)
+
+            for vote_type, vt_hist in vote_types.items():
                 # Count leading numbers in each votetype
-                vt_leading_nums = generate_leading_numbers_arr()
-                vt_total = 0
-
-                # Find vote by County in VoteType
-                for cccc in ccc:
-                    if cccc.tag != 'County':
-                        continue
-                    # County key to votes value
-                    votes[c.attrib['text']][cc.attrib['text']][ccc.attrib['name']][cccc.attrib['name']] = cccc.attrib['votes']
-
-                    # Get leading number
-                    if (FIRST_DIGIT_TEST and int(cccc.attrib['votes']) != 0) or (not FIRST_DIGIT_TEST and int(cccc.attrib['votes']) >= 10):
-                        val = int(cccc.attrib['votes'][int(not FIRST_DIGIT_TEST)])-int(FIRST_DIGIT_TEST)
-                        leading_nums[val] += 1
-                        vt_leading_nums[val] += 1
-                        vt_total += int(cccc.attrib['votes'])
-                        for n in ('Biden', 'Trump', 'Jorgensen'):
-                            if n in cc.attrib['text']:
-                                candidate_nums[n][val] += 1
-                                candidate_totals[n] = int(cc.attrib['totalVotes'])
-                                break
+                vt_leading_nums, vt_total = vt_hist['counts'][DIGIT_TEST], vt_hist['totals'][DIGIT_TEST]
+                choice_hist = histogram.merge(choice_hist, vt_hist)
+                stats_names.append((contest, choice, vote_type))
+                stats_counts.append(vt_leading_nums)
+                if FINAL_DIGITS_TEST:
+                    final_counts.append([vt_hist['counts'][t] for t in ('last', 'plast', 'last_two')])
+                for n in ('Biden', 'Trump', 'Jorgensen'):
+                    if n in choice:
+                        candidate_hists[n] = histogram.merge(candidate_hists[n], vt_hist)
+                        candidate_totals[n] = choice_total
+                        break
 
                 # Plot votetype results, only for presidential
-                if VOTETYPE_PLOTS and c.attrib['text'] == 'President of the United States':
-                    print(vt_leading_nums)
+                if VOTETYPE_PLOTS and contest == 'President of the United States':
+                    print(vt_leading_nums.tolist())
                     plot_benfords_law(
                         vt_leading_nums,
-                        c.attrib['text'],
-                        cc.attrib['text'],
+                        contest,
+                        choice,
                         vt_total,
-                        'By Votetype-{}'.format(ccc.attrib['name']),
-                        'Presidential-Plots'
-                        # 'Presidential-Plots' if c.attrib['text'] == 'President of the United States' else 'Non-Presidential-Plots'
+                        'By Votetype-{}'.format(vote_type),
+                        'Presidential-Plots',
+                        grid=contest_grid(contest, 'By Votetype', 'Presidential-Plots', len(vote_types))
                     )
 
             # Plot county results
-            print(leading_nums)
+            leading_nums = choice_hist['counts'][DIGIT_TEST]
+            print(leading_nums.tolist())
+            dir = 'Presidential-Plots' if contest == 'President of the United States' else 'Non-Presidential-Plots'
             plot_benfords_law(
-                leading_nums, c.attrib['text'],
-                cc.attrib['text'],
-                cc.attrib['totalVotes'],
-                'By County',
-                'Presidential-Plots' if c.attrib['text'] == 'President of the United States' else 'Non-Presidential-Plots'
+                leading_nums,
+                contest,
+                choice,
+                choice_total,
+                region_note(),
+                dir,
+                grid=contest_grid(contest, region_note(), dir)
             )
+            if FINAL_DIGITS_TEST:
+                final_nums = [choice_hist['counts'][t] for t in ('last', 'plast', 'last_two')]
+                print(final_nums[0].tolist())
+                print(final_nums[1].tolist())
+                plot_final_digits(final_nums, contest, choice, choice_total, dir)
 
-    # Plot Biden v Trump v Jorgensen results
-    # candidate_totals = list(map(lambda x: int(x), candidate_totals))
-    print(candidate_totals)
-    plot_benfords_law(
-        [candidate_nums[n] for n in ['Biden', 'Trump']],
-        '2020 Presdential Election', 'Biden v. Trump', sum([candidate_totals[x] for x in ['Biden', 'Trump']]),
-        'By County',
-        'Presidential-Plots',
-        biden_v_trump=True
-    )
-    plot_benfords_law(
-        [candidate_nums[n] for n in ['Biden', 'Trump', 'Jorgensen']],
-        '2020 Presidential Election', 'All candidates', sum([candidate_totals[x] for x in ['Biden', 'Trump', 'Jorgensen']]),
-        'By County',
-        'Presidential-Plots',
-        all_3=True
-    )
+    with instrument.stage('stats'):
+        if PRINT_STATS and stats_counts:
+            results = stats.conformity(stats_counts, DIGIT_TEST)
+            if CONFIDENCE_BANDS:
+                results['mc_p_value'] = simulate.empirical_p_values(stats_counts, DIGIT_TEST, SIMULATION_DRAWS, SIMULATION_WORKERS)
+            print(stats.report(stats_names, results))
+        if PRINT_STATS and final_counts:
+            last, plast, last_two = (np.array(c) for c in zip(*final_counts))
+            print(stats.final_digits_report(stats_names, stats.final_digits(last, plast, last_two)))
+        if VOTE_TYPE_TEST and stats_counts:
+            vote_type_counts = {}
+            for (contest, choice, vote_type), counts in zip(stats_names, stats_counts):
+                vote_type_counts.setdefault((contest, choice), {})[vote_type] = counts
+            pair_names, a, b = permutation.vote_type_pairs(vote_type_counts)
+            if pair_names:
+                print(permutation.report(pair_names, permutation.compare(a, b, PERMUTATION_DRAWS)))
+
+    with instrument.stage('plot'):
+        # Plot Biden v Trump v Jorgensen results
+        # candidate_totals = list(map(lambda x: int(x), candidate_totals))
+        print(candidate_totals)
+        plot_benfords_law(
+            [candidate_hists[n]['counts'][DIGIT_TEST] for n in ['Biden', 'Trump']],
+            '2020 Presdential Election', 'Biden v. Trump', sum([candidate_totals[x] for x in ['Biden', 'Trump']]),
+            region_note(),
+            'Presidential-Plots',
+            biden_v_trump=True
+        )
+        plot_benfords_law(
+            [candidate_hists[n]['counts'][DIGIT_TEST] for n in ['Biden', 'Trump', 'Jorgensen']],
+            '2020 Presidential Election', 'All candidates', sum([candidate_totals[x] for x in ['Biden', 'Trump', 'Jorgensen']]),
+            region_note(),
+            'Presidential-Plots',
+            all_3=True
+        )
+        if GRID_PLOTS:
+            render.plot_grids(SAVE_FIGS)
+
+def triage(tables):
+    # Score every contest, choice and votetype at once, write them ranked, and only plot the worst
+    names = ['contest', 'choice', 'vote_type']
+    with instrument.stage('count'):
+        if 'precincts' in tables:
+            # Already counted by read_precincts
+            hists = tables['precincts']['hists']
+            groups = list(hists)
+            counts = np.array([h['counts'][DIGIT_TEST] for h in hists.values()])
+            totals = np.array([h['totals'][DIGIT_TEST] for h in hists.values()])
+            last, plast, last_two = (np.array([h['counts'][test] for h in hists.values()]) for test in ('last', 'plast', 'last_two'))
+        else:
+            t = tables['detail']
+            groups, counts, totals = digits.table_histograms(t, names, DIGIT_TEST)
+            if FINAL_DIGITS_TEST:
+                _, last, plast, last_two = digits.table_final_digits(t, names)
+
+    with instrument.stage('stats'):
+        results = stats.conformity(counts, DIGIT_TEST)
+        # Largest MAD first, then largest size, groups too small to judge last
+        mad = np.nan_to_num(results['mad'], nan=-1)
+        order = np.lexsort((-results['n'], -mad, results['n'] < TRIAGE_MIN_SIZE))
+        columns = ['rank', 'contest', 'choice', 'vote_type', 'size', 'votes', 'chi2', 'p', 'mad', 'mad_class', 'ks']
+        if FINAL_DIGITS_TEST:
+            final = stats.final_digits(last, plast, last_two)
+            columns += ['last_p', 'pairs_p', 'repeated', 'repeated_p', 'adjacent', 'adjacent_p']
+        rows = []
+        for rank, i in enumerate(order, 1):
+            row = [rank, *groups[i], int(results['n'][i]), int(totals[i])]
+            row += [float(results[k][i]) for k in ('chi2', 'p_value', 'mad')] + [str(results['mad_class'][i]), float(results['ks'][i])]
+            if FINAL_DIGITS_TEST:
+                row += [float(final[k][i]) for k in ('last_p', 'pairs_p', 'repeated', 'repeated_p', 'adjacent', 'adjacent_p')]
+            rows.append(row)
+
+        with open(TRIAGE_OUTPUT + '.csv', 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(columns)
+            # Scores of groups with nothing to count are left blank
+            writer.writerows(['' if isinstance(x, float) and math.isnan(x) else x for x in row] for row in rows)
+        with open(TRIAGE_OUTPUT + '.json', 'w') as f:
+            json.dump([dict(zip(columns, row)) for row in rows], f, indent=2)
+        print('Saved "{}.csv" and "{}.json", {} groups ranked'.format(TRIAGE_OUTPUT, TRIAGE_OUTPUT, len(rows)))
+
+    with instrument.stage('plot'):
+        ranked = [i for i in order if results['n'][i] >= TRIAGE_MIN_SIZE]
+        if TRIAGE_THRESHOLD is not None:
+            ranked = [i for i in ranked if results['mad'][i] >= TRIAGE_THRESHOLD]
+        else:
+            ranked = ranked[:TRIAGE_TOP]
+        for i in ranked:
+            contest, choice, vote_type = groups[i]
+            plot_benfords_law(
+                counts[i],
+                contest,
+                choice,
+                totals[i],
+                'By Votetype-{}'.format(vote_type),
+                'Presidential-Plots' if contest == 'President of the United States' else 'Non-Presidential-Plots'
+            )
+        print('{} groups to plot'.format(len(ranked)))
+
+def main():
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.enable(PROFILE_STAGE)
+
+    with instrument.stage('ingest'):
+        tables = load(stream=not TRIAGE)
+    if TRIAGE:
+        triage(tables)
+    else:
+        run(tables)
+
+    if SAVE_FIGS:
+        with instrument.stage('render'):
+            render.flush(RENDER_WORKERS, FAST_RENDER, RENDER_CACHE)
+
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.finish(RUN_REPORT)
 
     if SHOW_PLOTS:
-        plt.show()
+        render.show()
 
 if __name__=='__main__':
     main()
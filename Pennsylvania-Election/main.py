@@ -1,25 +1,45 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from textwrap import wrap
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benford import digits, histogram, instrument, pennsylvania, permutation, reference, render, simulate, stats
 
 SHOW_PLOTS = True # Show interactive plot
+VOTES_CSV = 'pennsylvania_county_votes.csv' # Votes of every candidate by county (or precinct), with the columns of pennsylvania_county_votes.csv
+USE_CACHE = True # Reuse parsed VOTES_CSV from .benford-cache/ until it changes
+CHUNK_ROWS = None # Stream VOTES_CSV in chunks of this many rows and count digits per chunk, so memory stays flat for files of any size (None to read it whole)
 SAVE_FIGS = False # Save jpg of plot
+RENDER_WORKERS = None # Processes used to save jpgs (None for all cores)
+FAST_RENDER = True # Reuse one headless figure per plot layout when saving jpgs
+RENDER_CACHE = True # Only redo jpgs whose plot changed since they were saved (spec hashes in .render-manifest.json)
 MAIL_PLOTS = True # Show mail vote plots
 PROVISIONAL_PLOTS = True # Show provisional vote plots
-FIRST_DIGIT_TEST = True # First digit or second digit Benford's law test
-
-# Benford's law 1st digit test
-if FIRST_DIGIT_TEST:
-    S_BENFORDS = pd.Series(
-        [0.301, 0.176, 0.125, 0.097, 0.079, 0.067, 0.058, 0.051, 0.046],
-        index=range(1,10)
-    )
-# 2nd digit test
-else:
-    S_BENFORDS = pd.Series(
-        [0.12, 0.114, 0.109, 0.104, 0.1, 0.097, 0.093, 0.09, 0.088, 0.085],
-        index=range(0,10)
-    )
+GRID_PLOTS = None # Plot candidates by vote type as one grid of panels: 'jpg', or 'pdf' for pages of panels
+FIRST_DIGIT_TEST = True # First digit or second digit Benford's law test (run.py runs both)
+FINAL_DIGITS_TEST = False # Last 2 digits plots, and uniformity and repeated/adjacent pair stats of every candidate and vote type
+PRINT_STATS = True # Print conformity statistics (chi-square, MAD, KS) of every candidate and vote type
+COMPUTE_ONLY = False # Only count and print statistics, no plots, so pandas and matplotlib are never imported
+VOTE_TYPE_TEST = False # Permutation test of whether each candidate's mail, not mail and provisional ballots have different digit distributions
+PERMUTATION_DRAWS = 10000 # Permutations per pair of vote types
+CONFIDENCE_BANDS = True # Draw 95% Monte Carlo bands for each plot's sample size, and print Monte Carlo p-values
+SIMULATION_DRAWS = 10000 # Simulated samples per sample size
+SIMULATION_WORKERS = None # Processes used for simulations (None for all cores)
+RUN_REPORT = None # Write stage timings, counters and peak memory of the run as json to this path
+PROFILE_STAGE = None # cProfile one stage ('ingest', 'count', 'stats', 'plot' or 'render') and print its hot spots
+
+COLORS = {'BIDEN': 'b', 'TRUMP': 'r', 'JORGENSEN': 'g'}
+
+def set_digit_test(first_digit_test):
+    # Digit test of all counts and plots below
+    global FIRST_DIGIT_TEST, DIGIT_TEST, BENFORDS, BENFORDS_INDEX
+    FIRST_DIGIT_TEST = first_digit_test
+    DIGIT_TEST = 'first' if first_digit_test else 'second'
+    # Benford's law expected proportions for the digit test
+    BENFORDS = reference.probabilities(DIGIT_TEST)
+    BENFORDS_INDEX = reference.index(DIGIT_TEST)
+
+set_digit_test(FIRST_DIGIT_TEST)
 
 def totals_to_percentages(leading_nums, length):
     totals = 0
@@ -28,173 +48,183 @@ def totals_to_percentages(leading_nums, length):
     for i in range(length):
         tot_nums = sum(leading_nums[i])
         totals += tot_nums
-        s_leading_nums[i] = pd.Series(
-            map(lambda x: x / tot_nums, leading_nums[i]),
-            index=range(1,10) if FIRST_DIGIT_TEST else range(0,10)
-        )
+        s_leading_nums[i] = np.asarray(leading_nums[i]) / tot_nums
 
     return totals, s_leading_nums
 
-def set_bl_labels(p):
-    p.set_xlabel('{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'))
-    p.set_ylabel('Proportion')
+def plot_path(name):
+    return 'Presidential-Plots/{}/'.format('1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test')+name+'.jpg'
+
+def vote_type_grid(dir, title, sharey=True):
+    # One grid with a row of candidate panels per vote type in place of their own jpgs
+    if not GRID_PLOTS:
+        return None
+    return render.grid_spec(title, path='{}/Grids/{}.{}'.format(dir, title, GRID_PLOTS), ncols=len(COLORS), sharey=sharey)
 
-def save_plot(name):
-    n = 'Presidential-Plots/{}/'.format('1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test')+name+'.jpg'
-    plt.savefig(n)
-    print('Saved "{}"'.format(n))
-    plt.close()
+def plot_benfords_law(data, title, colors=['b', 'r', 'g', 'gray'], reference=None, band=None, legend=None, grid=None):
+    render.plot(render.plot_spec(
+        title,
+        data,
+        BENFORDS_INDEX,
+        colors,
+        path=plot_path(title),
+        reference=reference,
+        band=band,
+        xlabel='{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'),
+        ylabel='Proportion',
+        legend=legend,
+        rot=45
+    ), SAVE_FIGS, grid)
 
-def plot_benfords_law(df, colors=['b', 'r', 'g', 'gray']):
-    p = df.plot.bar(color=colors, rot=45)
-    set_bl_labels(p)
-    return p
+def plot_final_digits(final_nums, total_votes, type):
+    # Plot each candidate last 2 digits
+    for c, (last, plast, _) in final_nums.items():
+        title = 'PA 2020 Presidential Election ({}) - {} Vote Count - {:,}, Size - {:,} 2 Final Digits'.format(type, c, total_votes[c], int(last.sum()))
+        grid = vote_type_grid('Presidential-Plots/Final-Digits-Test', 'PA 2020 Presidential Election by Vote Type 2 Final Digits', sharey=False)
+        if grid:
+            title = '{} ({}) Vote Count - {:,}, Size - {:,}'.format(c, type, total_votes[c], int(last.sum()))
+        render.plot(render.final_digits_spec(
+            title,
+            last,
+            plast,
+            [COLORS[c], 'c'],
+            path='Presidential-Plots/Final-Digits-Test/'+title+'.jpg'
+        ), SAVE_FIGS, grid)
 
 def plot_results(leading_nums, s_leading_nums, total_votes, type):
     # Plot each candidate results
     for i, c in enumerate(leading_nums):
-        if c == 'BIDEN':
-            color = 'b'
-        elif c == 'TRUMP':
-            color = 'r'
-        elif c=='JORGENSEN':
-            color = 'g'
-        plt.figure()
-        p = plot_benfords_law(s_leading_nums[i], colors=[color])
-        p.plot(range(len(S_BENFORDS)), S_BENFORDS, '.-', color='y', markerfacecolor='w', markeredgecolor='gray')
-        p.legend(['Benford\'s law', 'Actual value'])
+        color = COLORS[c]
         title = 'PA 2020 Presidential Election ({}) - {} Vote Count - {:,}, Size - {:,}'.format(type, c, total_votes[c], sum(leading_nums[c]))
-        p.set_title('\n'.join(wrap(title, 60)))
-
-        if SAVE_FIGS:
-            save_plot(title)
+        grid = vote_type_grid(
+            'Presidential-Plots/{}'.format('1st-Digit-Test' if FIRST_DIGIT_TEST else '2nd-Digit-Test'),
+            'PA 2020 Presidential Election by Vote Type'
+        )
+        if grid:
+            title = '{} ({}) Vote Count - {:,}, Size - {:,}'.format(c, type, total_votes[c], sum(leading_nums[c]))
+        plot_benfords_law(
+            {'Actual value': s_leading_nums[i]},
+            title,
+            colors=[color],
+            reference=BENFORDS,
+            band=simulate.bands(sum(leading_nums[c]), DIGIT_TEST, SIMULATION_DRAWS) if CONFIDENCE_BANDS else None,
+            legend=['Benford\'s law', '95% band', 'Actual value'] if CONFIDENCE_BANDS else ['Benford\'s law', 'Actual value'],
+            grid=grid
+        )
 
-def generate_leading_numbers_arr():
-    return [0 for _ in range(9 if FIRST_DIGIT_TEST else 10)]
+def load():
+    if CHUNK_ROWS:
+        # Every digit test is counted while streaming, the rows themselves are not kept
+        data = pennsylvania.stream_county_votes(VOTES_CSV, CHUNK_ROWS)
+        instrument.count('records_ingested', data['rows'])
+        for column in pennsylvania.VOTE_COLUMNS:
+            histogram.count_skipped(histogram.merge_all(data['hists'][column]))
+        return data
+    columns = pennsylvania.read_county_votes(VOTES_CSV, USE_CACHE)
+    instrument.count('records_ingested', len(columns['Votes']))
+    for column in pennsylvania.VOTE_COLUMNS:
+        digits.count_skipped(columns[column])
+    return columns
 
-def main():
-    df = pd.read_csv('pennsylvania_county_votes.csv')[['County Name', 'Candidate Name', 'Votes', 'Mail Votes', 'Provisional Votes']]
+def run(columns):
+    # Count, print and plot the loaded data with the current digit test
     # print(df.head())
 
-    # Get leading numbers of each candidate
-    leading_nums = {
-        'BIDEN': generate_leading_numbers_arr(),
-        'TRUMP': generate_leading_numbers_arr(),
-        'JORGENSEN': generate_leading_numbers_arr()
-    }
-    total_votes = {
-        'BIDEN': 0,
-        'TRUMP': 0,
-        'JORGENSEN': 0
-    }
-    if MAIL_PLOTS:
-        leading_mail_nums = {
-            'BIDEN': generate_leading_numbers_arr(),
-            'TRUMP': generate_leading_numbers_arr(),
-            'JORGENSEN': generate_leading_numbers_arr()
-        }
-        total_mail_votes = {
-            'BIDEN': 0,
-            'TRUMP': 0,
-            'JORGENSEN': 0
-        }
-        leading_not_mail_nums = {
-        'BIDEN': generate_leading_numbers_arr(),
-        'TRUMP': generate_leading_numbers_arr(),
-        'JORGENSEN': generate_leading_numbers_arr()
-        }
-        total_not_mail_votes = {
-        'BIDEN': 0,
-        'TRUMP': 0,
-        'JORGENSEN': 0
-        }
-    if PROVISIONAL_PLOTS:
-        leading_prov_nums = {
-            'BIDEN': generate_leading_numbers_arr(),
-            'TRUMP': generate_leading_numbers_arr(),
-            'JORGENSEN': generate_leading_numbers_arr()
-        }
-        total_prov_votes = {
-            'BIDEN': 0,
-            'TRUMP': 0,
-            'JORGENSEN': 0
-        }
-
-    def count_votes(votes, leading_nums, total_votes, name):
-        votes = votes.replace(',', '')
-        if (FIRST_DIGIT_TEST and int(votes) != 0) or (not FIRST_DIGIT_TEST and int(votes) >= 10):
-            leading_nums[name][int(votes[int(not FIRST_DIGIT_TEST)])-int(FIRST_DIGIT_TEST)] += 1
-            total_votes[name] += int(votes.replace(',', ''))
-
-    for _, r in df.iterrows():
-        for name in ['BIDEN', 'TRUMP', 'JORGENSEN', 'err']:
-            if name == 'err':
-                raise Exception('Unknown candidate name')
-            if name in r['Candidate Name']:
-                count_votes(r['Votes'], leading_nums, total_votes, name)
-                if MAIL_PLOTS:
-                    count_votes(r['Mail Votes'], leading_mail_nums, total_mail_votes, name)
-                    r_not_mail_votes = pd.to_numeric(r['Votes'].replace(',',''))-pd.to_numeric(r['Mail Votes'].replace(',',''))-pd.to_numeric(r['Provisional Votes'].replace(',',''))
-                    count_votes(str(r_not_mail_votes), leading_not_mail_nums, total_not_mail_votes, name)
-                if PROVISIONAL_PLOTS:
-                    count_votes(r['Provisional Votes'], leading_prov_nums, total_prov_votes, name)
-                break
+    with instrument.stage('count'):
+        # Get leading numbers of each candidate
+        leading_nums, total_votes = pennsylvania.count_candidates(columns, 'Votes', DIGIT_TEST)
+        if MAIL_PLOTS:
+            leading_mail_nums, total_mail_votes = pennsylvania.count_candidates(columns, 'Mail Votes', DIGIT_TEST)
+            leading_not_mail_nums, total_not_mail_votes = pennsylvania.count_candidates(columns, 'Not Mail Votes', DIGIT_TEST)
+        if PROVISIONAL_PLOTS:
+            leading_prov_nums, total_prov_votes = pennsylvania.count_candidates(columns, 'Provisional Votes', DIGIT_TEST)
+        if FINAL_DIGITS_TEST:
+            final_vote_types = [('All Votes', 'Votes', total_votes)]
+            if MAIL_PLOTS:
+                final_vote_types += [('Mail Ballots', 'Mail Votes', total_mail_votes), ('Not Mail Ballots', 'Not Mail Votes', total_not_mail_votes)]
+            if PROVISIONAL_PLOTS:
+                final_vote_types.append(('Provisional Ballots', 'Provisional Votes', total_prov_votes))
+            final_nums = [(t, pennsylvania.count_final_digits(columns, column), totals) for t, column, totals in final_vote_types]
+
+    with instrument.stage('stats'):
+        vote_types = [('All Votes', leading_nums)]
+        if MAIL_PLOTS:
+            vote_types += [('Mail Ballots', leading_mail_nums), ('Not Mail Ballots', leading_not_mail_nums)]
+        if PROVISIONAL_PLOTS:
+            vote_types.append(('Provisional Ballots', leading_prov_nums))
+        if PRINT_STATS:
+            stats_names = [(c, t) for t, nums in vote_types for c in nums]
+            stats_counts = [nums[c] for _, nums in vote_types for c in nums]
+            results = stats.conformity(stats_counts, DIGIT_TEST)
+            if CONFIDENCE_BANDS:
+                results['mc_p_value'] = simulate.empirical_p_values(stats_counts, DIGIT_TEST, SIMULATION_DRAWS, SIMULATION_WORKERS)
+            print(stats.report(stats_names, results))
+        if PRINT_STATS and FINAL_DIGITS_TEST:
+            final_names = [(c, t) for t, nums, _ in final_nums for c in nums]
+            last, plast, last_two = (np.array(c) for c in zip(*[nums[c] for _, nums, _ in final_nums for c in nums]))
+            print(stats.final_digits_report(final_names, stats.final_digits(last, plast, last_two)))
+        if VOTE_TYPE_TEST:
+            # All Votes overlaps every other vote type, so only those are compared
+            pair_names, a, b = permutation.vote_type_pairs({
+                c: {t: nums[c] for t, nums in vote_types if t != 'All Votes'} for c in leading_nums
+            })
+            if pair_names:
+                print(permutation.report(pair_names, permutation.compare(a, b, PERMUTATION_DRAWS)))
 
     # print(leading_nums)
     # print(leading_mail_nums)
     # print(leading_prov_nums)
     # print(leading_not_mail_nums)
 
-    # Convert counts to percentages
-    def counts_to_percentages(leading_nums):
-        return totals_to_percentages(
-            [leading_nums['BIDEN'], leading_nums['TRUMP'], leading_nums['JORGENSEN']],
-            3
-        )
-    totals, s_leading_nums = counts_to_percentages(leading_nums)
-    if MAIL_PLOTS:
-        mail_totals, s_leading_mail_nums = counts_to_percentages(leading_mail_nums)
-        not_mail_totals, s_leading_not_mail_nums = counts_to_percentages(leading_not_mail_nums)
-    if PROVISIONAL_PLOTS:
-        prov_totals, s_leading_prov_nums = counts_to_percentages(leading_prov_nums)
-
-    # Plot individual results
-    plot_results(leading_nums, s_leading_nums, total_votes, 'All Votes')
-    if MAIL_PLOTS:
-        plot_results(leading_mail_nums, s_leading_mail_nums, total_mail_votes, 'Mail Ballots')
-        plot_results(leading_not_mail_nums, s_leading_not_mail_nums, total_not_mail_votes, 'Not Mail Ballots')
-    if PROVISIONAL_PLOTS:
-        plot_results(leading_prov_nums, s_leading_prov_nums, total_prov_votes, 'Provisional Ballots')
-
-    # Plot candidate results against each other
-    df_leading_nums = pd.DataFrame({
-        'Biden': s_leading_nums[0],
-        'Trump': s_leading_nums[1],
-        'Jorgensen': s_leading_nums[2],
-        'Benford\'s Law': S_BENFORDS
-    })
-    p = plot_benfords_law(df_leading_nums)
-    title = '2020 Presdential Election (All Votes) - All candidates Vote Count - {:,}, Size - {:,}'.format(
-        sum([total_votes[c] for c in ['BIDEN', 'TRUMP', 'JORGENSEN']]),
-        sum([sum(leading_nums[a]) for a in ['BIDEN', 'TRUMP', 'JORGENSEN']])
-    )
-    p.set_title('\n'.join(wrap(title, 60)))
-    if SAVE_FIGS:
-        save_plot(title)
-
-    df_leading_nums = pd.DataFrame({
-        'Biden': s_leading_nums[0],
-        'Trump': s_leading_nums[1],
-        'Benford\'s Law': S_BENFORDS
-    })
-    p = plot_benfords_law(df_leading_nums, colors=['b', 'r', 'gray'])
-    title = '2020 Presdential Election (All Votes) - Biden v. Trump Vote Count - {:,}, Size - {:,}'.format(
-        sum([total_votes[c] for c in ['BIDEN', 'TRUMP']]),
-        sum([sum(leading_nums[a]) for a in ['BIDEN', 'TRUMP']])
-    )
-    p.set_title('\n'.join(wrap(title, 60)))
-    if SAVE_FIGS:
-        save_plot(title)
+    if not COMPUTE_ONLY:
+        with instrument.stage('plot'):
+            # Convert counts to percentages
+            def counts_to_percentages(leading_nums):
+                return totals_to_percentages(
+                    [leading_nums['BIDEN'], leading_nums['TRUMP'], leading_nums['JORGENSEN']],
+                    3
+                )
+            totals, s_leading_nums = counts_to_percentages(leading_nums)
+            if MAIL_PLOTS:
+                mail_totals, s_leading_mail_nums = counts_to_percentages(leading_mail_nums)
+                not_mail_totals, s_leading_not_mail_nums = counts_to_percentages(leading_not_mail_nums)
+            if PROVISIONAL_PLOTS:
+                prov_totals, s_leading_prov_nums = counts_to_percentages(leading_prov_nums)
+
+            # Plot individual results
+            plot_results(leading_nums, s_leading_nums, total_votes, 'All Votes')
+            if MAIL_PLOTS:
+                plot_results(leading_mail_nums, s_leading_mail_nums, total_mail_votes, 'Mail Ballots')
+                plot_results(leading_not_mail_nums, s_leading_not_mail_nums, total_not_mail_votes, 'Not Mail Ballots')
+            if PROVISIONAL_PLOTS:
+                plot_results(leading_prov_nums, s_leading_prov_nums, total_prov_votes, 'Provisional Ballots')
+            if FINAL_DIGITS_TEST:
+                for t, nums, totals in final_nums:
+                    plot_final_digits(nums, totals, t)
+
+            # Plot candidate results against each other
+            title = '2020 Presdential Election (All Votes) - All candidates Vote Count - {:,}, Size - {:,}'.format(
+                sum([total_votes[c] for c in ['BIDEN', 'TRUMP', 'JORGENSEN']]),
+                sum([sum(leading_nums[a]) for a in ['BIDEN', 'TRUMP', 'JORGENSEN']])
+            )
+            plot_benfords_law({
+                'Biden': s_leading_nums[0],
+                'Trump': s_leading_nums[1],
+                'Jorgensen': s_leading_nums[2],
+                'Benford\'s Law': BENFORDS
+            }, title)
+
+            title = '2020 Presdential Election (All Votes) - Biden v. Trump Vote Count - {:,}, Size - {:,}'.format(
+                sum([total_votes[c] for c in ['BIDEN', 'TRUMP']]),
+                sum([sum(leading_nums[a]) for a in ['BIDEN', 'TRUMP']])
+            )
+            plot_benfords_law({
+                'Biden': s_leading_nums[0],
+                'Trump': s_leading_nums[1],
+                'Benford\'s Law': BENFORDS
+            }, title, colors=['b', 'r', 'gray'])
+            if GRID_PLOTS:
+                render.plot_grids(SAVE_FIGS)
 
     # Print totals
     sum_vote_counts = 0
@@ -204,8 +234,23 @@ def main():
     for c in ['BIDEN', 'TRUMP', 'JORGENSEN']:
         print('{:<9} : {:%} ({:,})'.format(c, total_votes[c]/sum_vote_counts, total_votes[c]))
 
+def main():
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.enable(PROFILE_STAGE)
+
+    with instrument.stage('ingest'):
+        columns = load()
+    run(columns)
+
+    if SAVE_FIGS:
+        with instrument.stage('render'):
+            render.flush(RENDER_WORKERS, FAST_RENDER, RENDER_CACHE)
+
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.finish(RUN_REPORT)
+
     if SHOW_PLOTS:
-        plt.show()
+        render.show()
 
 if __name__=='__main__':
     main()
@@ -0,0 +1,202 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+import matplotlib
+
+matplotlib.use('Agg')
+from benford import cache, clarity, digits, pennsylvania, race_index, reference, render, simulate, stats, synthetic
+
+# Parser of each dataset, and the table, grouping columns and vote columns its counts are read from
+DATASETS = {
+    'nationwide': (race_index.read_tables, 'counties', ['region', 'candidate'], ['votes']),
+    'georgia': (clarity.read_tables, 'detail', ['choice', 'vote_type'], ['votes']),
+    'pennsylvania': (pennsylvania.read_tables, 'votes', ['Candidate Name'], pennsylvania.VOTE_COLUMNS),
+}
+VARIANTS = {'conforming': False, 'tampered': True}
+# What a script imports at startup in compute only mode, and what every run imported before plotting was lazy
+STARTUP = {
+    'compute_only': 'from benford import cache, clarity, digits, histogram, instrument, live, pennsylvania, race_index, render, simulate, stats',
+    'plotting': 'from benford import cache, clarity, digits, histogram, instrument, live, pennsylvania, race_index, render, simulate, stats; import pandas, matplotlib.pyplot',
+}
+
+@contextlib.contextmanager
+def timed(times, stage):
+    start = time.perf_counter()
+    yield
+    times[stage] = time.perf_counter() - start
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_dataset(dataset, size, tampered, work_dir, args):
+    read, table_name, names, columns = DATASETS[dataset]
+    write, file_name = synthetic.WRITERS[dataset]
+    path = os.path.join(work_dir, file_name)
+    times = {}
+
+    with timed(times, 'generate'):
+        write(path, size, np.random.default_rng(args.seed), tampered)
+    with timed(times, 'ingest'):
+        t = read(path)[table_name]
+    with timed(times, 'cache_store'):
+        cache.store(path, {table_name: t})
+    with timed(times, 'cache_load'):
+        t = cache.load(path)[table_name]
+
+    with timed(times, 'count'):
+        counts = {
+            (test, column): digits.table_histograms(t, names, test, column)[1]
+            for test in digits.TESTS for column in columns
+        }
+    first = counts[('first', columns[0])]
+
+    with timed(times, 'stats'):
+        results = stats.conformity(first, 'first')
+        for column in columns:
+            stats.conformity(counts[('second', column)], 'second')
+    # Sample sizes repeat between runs, so drop earlier simulations to time them again
+    simulate._simulations.clear()
+    with timed(times, 'simulate'):
+        simulate.empirical_p_values(first, 'first', args.draws, args.workers)
+
+    specs = []
+    index = reference.index('first')
+    for i, row in enumerate(first[:args.figures]):
+        specs.append(render.plot_spec(
+            '{} {} {} group {}'.format(dataset, size, 'tampered' if tampered else 'conforming', i),
+            {'Actual value': row / max(row.sum(), 1)},
+            index,
+            ['b'],
+            path=os.path.join(work_dir, 'figure-{}.jpg'.format(i)),
+            reference=reference.probabilities('first'),
+            rot=45
+        ))
+    with timed(times, 'render'), contextlib.redirect_stdout(io.StringIO()):
+        render.render_all(specs, args.workers, fast=True)
+
+    # Conformity of all groups pooled, tampered variants should stand out
+    pooled = stats.conformity(first.sum(axis=0), 'first')
+    return {
+        'dataset': dataset,
+        'size': size,
+        'variant': 'tampered' if tampered else 'conforming',
+        'rows': int(len(t['columns'][columns[0]])),
+        'groups': int(len(first)),
+        'figures': len(specs),
+        'bytes': os.path.getsize(path),
+        'mad': float(pooled['mad'][0]),
+        'mad_class': str(pooled['mad_class'][0]),
+        'group_mad_median': float(np.nanmedian(results['mad'])) if len(first) else None,
+        'seconds': times,
+    }
+
+def time_startup(code, runs):
+    # Best wall time of a fresh interpreter running code, interpreter startup included
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def compare(old, new):
+    # Time of every stage relative to an older results file
+    old_runs = {(r['dataset'], r['size'], r['variant']): r['seconds'] for r in old['results']}
+    lines = ['{:<14}{:>12}  {:<12}{:<12}{:>10}{:>10}{:>8}'.format('Dataset', 'Size', 'Variant', 'Stage', 'Old', 'New', 'Ratio')]
+    for r in new['results']:
+        old_times = old_runs.get((r['dataset'], r['size'], r['variant']))
+        if old_times is None:
+            continue
+        for stage, seconds in r['seconds'].items():
+            if stage in old_times:
+                lines.append('{:<14}{:>12,}  {:<12}{:<12}{:>10.3f}{:>10.3f}{:>8.2f}'.format(
+                    r['dataset'], r['size'], r['variant'], stage, old_times[stage], seconds,
+                    seconds / old_times[stage] if old_times[stage] else float('nan')
+                ))
+    old_startup = old.get('startup', {})
+    for name, seconds in new.get('startup', {}).items():
+        if name in old_startup:
+            lines.append('{:<14}{:>12}  {:<12}{:<12}{:>10.3f}{:>10.3f}{:>8.2f}'.format(
+                'startup', '', '', name, old_startup[name], seconds, seconds / old_startup[name]
+            ))
+    return '\n'.join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Time ingest, counting, statistics and rendering on synthetic datasets')
+    parser.add_argument('--datasets', nargs='*', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000], help='Vote counts per dataset')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--draws', type=int, default=1000, help='Simulated samples per sample size')
+    parser.add_argument('--figures', type=int, default=20, help='Figures rendered per run')
+    parser.add_argument('--workers', type=int, help='Processes for simulations and rendering (default: all cores)')
+    parser.add_argument('--startup', type=int, default=5, help='Fresh interpreters timed for startup with and without plotting imports (0 to skip)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dir', help='Where synthetic files are written (default: a temporary directory)')
+    parser.add_argument('--out', default='benchmark.json', help='Results file')
+    parser.add_argument('--compare', help='Older results file to compare against')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = args.dir or tempfile.mkdtemp(prefix='benford-benchmark-')
+    os.makedirs(work_dir, exist_ok=True)
+    startup = {}
+    if args.startup:
+        startup['python'] = time_startup('pass', args.startup)
+        for name, code in STARTUP.items():
+            startup[name] = time_startup(code, args.startup)
+        print('Startup  python {:.3f}s  compute only {:.3f}s  with plotting {:.3f}s ({:.1f}x)'.format(
+            startup['python'], startup['compute_only'], startup['plotting'], startup['plotting'] / startup['compute_only']
+        ))
+
+    results = []
+    try:
+        for dataset in args.datasets:
+            for size in args.sizes:
+                for variant in args.variants:
+                    r = bench_dataset(dataset, size, VARIANTS[variant], work_dir, args)
+                    print('{:<14}{:>12,}  {:<12}{}'.format(
+                        dataset, size, variant, '  '.join('{} {:.3f}s'.format(s, x) for s, x in r['seconds'].items())
+                    ))
+                    results.append(r)
+    finally:
+        if not args.dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+        'startup': startup,
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Saved "{}"'.format(args.out))
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), report))
+
+if __name__=='__main__':
+    main(sys.argv[1:])
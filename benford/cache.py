@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from benford import instrument
+
+CACHE_DIR = '.benford-cache'
+VERSION = 2
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_key(path):
+    st = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'size': st.st_size,
+        'mtime': st.st_mtime_ns,
+    }
+
+def cache_dir(path):
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), CACHE_DIR, os.path.basename(path))
+
+def _read_meta(d):
+    try:
+        with open(os.path.join(d, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(d, meta):
+    tmp = os.path.join(d, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(d, 'meta.json'))
+
+def load(path):
+    # Tables of a valid cache entry, memory mapped, or None if stale or missing
+    d = cache_dir(path)
+    meta = _read_meta(d)
+    if meta is None or meta['version'] != VERSION:
+        return None
+    key = source_key(path)
+    if meta['path'] != key['path'] or meta['size'] != key['size']:
+        return None
+    if meta['mtime'] != key['mtime']:
+        # Touched but maybe not changed, compare contents
+        if meta['sha256'] != file_hash(path):
+            return None
+        meta['mtime'] = key['mtime']
+        _write_meta(d, meta)
+    tables = {}
+    for name, t in meta['tables'].items():
+        tables[name] = {
+            'columns': {
+                c: np.load(os.path.join(d, '{}.{}.npy'.format(name, c)), mmap_mode='r')
+                for c in t['columns']
+            },
+            'labels': t['labels'],
+        }
+    return tables
+
+def store(path, tables):
+    d = cache_dir(path)
+    shutil.rmtree(d, ignore_errors=True)
+    os.makedirs(d)
+    meta = source_key(path)
+    meta['version'] = VERSION
+    meta['sha256'] = file_hash(path)
+    meta['tables'] = {}
+    for name, t in tables.items():
+        for c, arr in t['columns'].items():
+            npy = os.path.join(d, '{}.{}.npy'.format(name, c))
+            np.save(npy, np.ascontiguousarray(arr))
+            instrument.count('bytes_written', os.path.getsize(npy))
+        meta['tables'][name] = {'columns': list(t['columns']), 'labels': t['labels']}
+    # Written last, a cache entry without meta.json is never loaded
+    _write_meta(d, meta)
+
+def cached_tables(path, build):
+    # Tables parsed from path by build(path), reused until the source changes
+    tables = load(path)
+    if tables is None:
+        tables = build(path)
+        store(path, tables)
+    return tables
@@ -0,0 +1,137 @@
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from benford import digits, histogram, table
+
+def iter_contests(source, contests=None):
+    # Stream Contest elements from a Clarity detail.xml, each one is cleared
+    # from the tree after it is consumed so memory is bounded by one Contest
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+            continue
+        if event != 'end' or elem.tag != 'Contest':
+            continue
+        if contests is None or elem.attrib['text'] in contests:
+            yield elem
+        root.clear()
+
+def iter_choices(source, contests=None, region_tag='County'):
+    # Yield (contest, choice, total votes, {votetype: votes by region}) for every Choice
+    for contest in iter_contests(source, contests):
+        for choice in contest.findall('Choice'):
+            vote_types = {}
+            for vt in choice.findall('VoteType'):
+                vote_types[vt.attrib['name']] = digits.to_array(
+                    [r.attrib['votes'] for r in vt.findall(region_tag)]
+                )
+            yield contest.attrib['text'], choice.attrib['text'], int(choice.attrib['totalVotes']), vote_types
+
+def read_table(source, region_tag='County'):
+    # One row per (contest, choice, votetype, region), streamed like iter_choices
+    b = table.builder(['contest', 'choice', 'vote_type', 'region'], ['votes'])
+    for contest in iter_contests(source):
+        for choice in contest.findall('Choice'):
+            for vt in choice.findall('VoteType'):
+                labels = [contest.attrib['text'], choice.attrib['text'], vt.attrib['name'], None]
+                for r in vt.findall(region_tag):
+                    labels[3] = r.attrib['name']
+                    table.append(b, labels, (digits.to_int(r.attrib['votes']),))
+    return table.build(b)
+
+def read_tables(source):
+    return {'detail': read_table(source)}
+
+def iter_table_choices(t, contests=None):
+    # Same as iter_choices but reading from a table, choice totals are summed from the votes
+    labels = t['labels']
+    votes = t['columns']['votes']
+    vote_type_codes = t['columns']['vote_type']
+    for code, rows in table.group_rows(table.combined_codes(t, ['contest', 'choice'])):
+        contest, choice = divmod(int(code), len(labels['choice']))
+        contest, choice = labels['contest'][contest], labels['choice'][choice]
+        if contests is not None and contest not in contests:
+            continue
+        vote_types = {}
+        for vt, vt_rows in table.group_rows(vote_type_codes[rows]):
+            vote_types[labels['vote_type'][vt]] = votes[rows[vt_rows]]
+        yield contest, choice, int(votes[rows].sum()), vote_types
+
+def precinct_sources(path):
+    # (file, zip member) of every county's precinct level detail.xml in a directory or zip,
+    # a county can also be its own zip holding its detail.xml
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            return [(path, m) for m in sorted(z.namelist()) if m.lower().endswith(('.xml', '.zip'))]
+    sources = []
+    for dirpath, dirnames, files in os.walk(path):
+        dirnames.sort()
+        sources += [(os.path.join(dirpath, f), None) for f in sorted(files) if f.lower().endswith(('.xml', '.zip'))]
+    return sources
+
+def open_source(path, member=None):
+    if member is None:
+        if not zipfile.is_zipfile(path):
+            return open(path, 'rb')
+        county = path
+    else:
+        with zipfile.ZipFile(path) as z:
+            county = io.BytesIO(z.read(member))
+        if not member.lower().endswith('.zip'):
+            return county
+    with zipfile.ZipFile(county) as z:
+        xml = [m for m in z.namelist() if m.lower().endswith('.xml')]
+        if len(xml) != 1:
+            raise Exception('Expected one xml file in {}, found {}'.format(member or path, len(xml)))
+        return io.BytesIO(z.read(xml[0]))
+
+def count_precincts(source, tests=digits.TESTS, region_tag='Precinct'):
+    # Histograms of one county by (contest, choice, votetype) packed for the trip back from a
+    # worker, and the county's choice totals
+    hists = {}
+    totals = {}
+    with open_source(*source) as f:
+        for contest, choice, total, vote_types in iter_choices(f, region_tag=region_tag):
+            totals[(contest, choice)] = totals.get((contest, choice), 0) + total
+            for vt, votes in vote_types.items():
+                h = histogram.histogram(votes, tests)
+                key = (contest, choice, vt)
+                hists[key] = histogram.merge(hists[key], h) if key in hists else h
+    return histogram.dumps(hists), totals
+
+def read_precincts(path, tests=digits.TESTS, workers=None, region_tag='Precinct'):
+    # Count every county file in a process pool and merge them in county order
+    sources = precinct_sources(path)
+    if not sources:
+        raise Exception('No detail.xml files in {}'.format(path))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sources) <= 1:
+        results = [count_precincts(s, tests, region_tag) for s in sources]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            n = len(sources)
+            results = list(pool.map(count_precincts, sources, [tests] * n, [region_tag] * n))
+    hists = {}
+    totals = {}
+    for packed, county_totals in results:
+        hists = histogram.merge_groups(hists, histogram.loads(packed))
+        for key, total in county_totals.items():
+            totals[key] = totals.get(key, 0) + total
+    return {'hists': hists, 'totals': totals, 'files': len(sources)}
+
+def iter_histogram_choices(choices, tests):
+    # iter_choices or iter_table_choices with each votetype's votes counted into a histogram
+    for contest, choice, total, vote_types in choices:
+        yield contest, choice, total, {vt: histogram.histogram(votes, tests) for vt, votes in vote_types.items()}
+
+def iter_precinct_choices(precincts, contests=None, tests=None):
+    # Same as iter_histogram_choices from read_precincts counts, choices in the order first seen
+    choices = {}
+    for (contest, choice, vt), h in precincts['hists'].items():
+        if contests is None or contest in contests:
+            choices.setdefault((contest, choice), {})[vt] = h if tests is None else histogram.select(h, tests)
+    for (contest, choice), vote_types in choices.items():
+        yield contest, choice, precincts['totals'][(contest, choice)], vote_types
@@ -0,0 +1,141 @@
+import numpy as np
+from benford import instrument, table
+
+# Digit tests: leading digit, second digit, last digit, second to last digit,
+# first two digits, first three digits, last two digits
+TESTS = ('first', 'second', 'last', 'plast', 'first_two', 'first_three', 'last_two')
+
+# Digit values counted by each test
+DIGIT_RANGES = {
+    'first': range(1, 10),
+    'second': range(0, 10),
+    'last': range(0, 10),
+    'plast': range(0, 10),
+    'first_two': range(10, 100),
+    'first_three': range(100, 1000),
+    'last_two': range(0, 100),
+}
+
+# Tests the scripts run, the ones run reports count skipped values of
+SCRIPT_TESTS = ('first', 'second', 'last', 'plast', 'last_two')
+
+# Powers of 10 that fit in int64, used as an integer log10 table
+POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+def to_array(votes):
+    # Accept lists of ints, numeric strings or arrays
+    arr = np.asarray(votes)
+    if arr.dtype.kind in 'US':
+        arr = np.char.replace(arr.astype(str), ',', '')
+    return arr.astype(np.int64, copy=False).ravel()
+
+def to_int(value):
+    # One count from an int or a numeric string with thousands separators
+    return value if isinstance(value, int) else int(str(value).replace(',', ''))
+
+def num_digits(arr):
+    # Number of decimal digits of each positive value (integer log10 + 1)
+    return np.searchsorted(POW10, arr, side='right')
+
+def eligible(arr, test):
+    # Zeros are skipped, values under 10 have no 2nd or 2nd to last digit
+    if test in ('first', 'last'):
+        return arr > 0
+    if test == 'first_three':
+        return arr >= 100
+    return arr >= 10
+
+def count_skipped(votes, tests=SCRIPT_TESTS):
+    # Values each test leaves out of one ingested column, counted once at load time
+    if not instrument.ENABLED:
+        return
+    arr = to_array(votes)
+    for test in tests:
+        instrument.count_skipped(arr, eligible(arr, test), test)
+
+def extract_digits(arr, test, n=None):
+    # arr must already be filtered by eligible()
+    if test == 'first':
+        if n is None:
+            n = num_digits(arr)
+        return arr // POW10[n-1]
+    if test == 'second':
+        if n is None:
+            n = num_digits(arr)
+        return (arr // POW10[n-2]) % 10
+    if test == 'last':
+        return arr % 10
+    if test == 'plast':
+        return (arr // 10) % 10
+    if test == 'last_two':
+        return arr % 100
+    if test in ('first_two', 'first_three'):
+        if n is None:
+            n = num_digits(arr)
+        return arr // POW10[n - (2 if test == 'first_two' else 3)]
+    raise Exception('Unknown digit test ({})'.format(test))
+
+def digit_histogram(votes, test):
+    arr = to_array(votes)
+    mask = eligible(arr, test)
+    vals = arr[mask]
+    counts = np.bincount(extract_digits(vals, test), minlength=DIGIT_RANGES[test].stop)
+    return counts[DIGIT_RANGES[test].start:], int(vals.sum())
+
+def digit_histograms(votes, tests=TESTS):
+    # Histogram and eligible vote total for each test, sharing one digit length pass
+    arr = to_array(votes)
+    positive = arr > 0
+    n = np.zeros(arr.shape, dtype=np.int64)
+    n[positive] = num_digits(arr[positive])
+    results = {}
+    for test in tests:
+        mask = eligible(arr, test)
+        vals = arr[mask]
+        counts = np.bincount(extract_digits(vals, test, n[mask]), minlength=DIGIT_RANGES[test].stop)
+        results[test] = (counts[DIGIT_RANGES[test].start:], int(vals.sum()))
+    return results
+
+def grouped_digit_histogram(codes, n_groups, votes, test):
+    # Histograms of every group at once, codes are group numbers (negative to skip)
+    arr = to_array(votes)
+    codes = np.asarray(codes, dtype=np.int64).ravel()
+    mask = eligible(arr, test) & (codes >= 0)
+    vals, codes = arr[mask], codes[mask]
+    width = DIGIT_RANGES[test].stop
+    counts = np.bincount(codes*width + extract_digits(vals, test), minlength=n_groups*width).reshape(n_groups, width)
+    totals = np.zeros(n_groups, dtype=np.int64)
+    np.add.at(totals, codes, vals)
+    return counts[:, DIGIT_RANGES[test].start:], totals
+
+def grouped_final_digits(codes, n_groups, votes):
+    # Last, second to last and joint last two digit (00-99) histograms of every group in one pass,
+    # like the 'last', 'plast' and 'last_two' tests only values of at least 10 have the last two
+    arr = to_array(votes)
+    codes = np.asarray(codes, dtype=np.int64).ravel()
+    keep = codes >= 0
+    positive = eligible(arr, 'last')
+    arr, codes = arr[keep & positive], codes[keep & positive]
+    two = arr % 100
+    last = np.bincount(codes*10 + two % 10, minlength=n_groups*10).reshape(n_groups, 10)
+    big = arr >= 10
+    joint = np.bincount(codes[big]*100 + two[big], minlength=n_groups*100).reshape(n_groups, 100)
+    # Rows of the joint histogram are the second to last digit
+    return last, joint.reshape(n_groups, 10, 10).sum(axis=2), joint
+
+def final_digit_histograms(votes):
+    arr = to_array(votes)
+    last, plast, joint = grouped_final_digits(np.zeros(len(arr), dtype=np.int64), 1, arr)
+    return last[0], plast[0], joint[0]
+
+def table_histograms(t, names, test, column='votes'):
+    # Histograms of every combination of the encoded columns names present in a table
+    keys, inverse = np.unique(table.combined_codes(t, names), return_inverse=True)
+    counts, totals = grouped_digit_histogram(inverse, len(keys), t['columns'][column], test)
+    return [table.decode_codes(t, names, k) for k in keys], counts, totals
+
+def table_final_digits(t, names, column='votes'):
+    # Final digit histograms of every combination of the encoded columns names present in a table
+    keys, inverse = np.unique(table.combined_codes(t, names), return_inverse=True)
+    last, plast, joint = grouped_final_digits(inverse, len(keys), t['columns'][column])
+    return [table.decode_codes(t, names, k) for k in keys], last, plast, joint
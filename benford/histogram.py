@@ -0,0 +1,120 @@
+import json
+import struct
+import zlib
+import numpy as np
+from benford import digits, instrument
+
+# A histogram is {'counts': {test: counts}, 'totals': {test: eligible vote total},
+# 'votes': vote total, 'n': number of counts}. merge() is associative and
+# commutative, so shards counted apart reduce to the same result as one pass
+
+def empty(tests=digits.TESTS):
+    return {
+        'counts': {test: np.zeros(len(digits.DIGIT_RANGES[test]), dtype=np.int64) for test in tests},
+        'totals': {test: 0 for test in tests},
+        'votes': 0,
+        'n': 0,
+    }
+
+def histogram(votes, tests=digits.TESTS):
+    arr = digits.to_array(votes)
+    h = {'counts': {}, 'totals': {}, 'votes': int(arr.sum()), 'n': len(arr)}
+    for test, (counts, total) in digits.digit_histograms(arr, tests).items():
+        h['counts'][test] = counts.astype(np.int64, copy=False)
+        h['totals'][test] = total
+    return h
+
+def grouped(codes, n_groups, votes, tests=digits.TESTS):
+    # Histogram of every group at once, codes are group numbers (negative to skip)
+    arr = digits.to_array(votes)
+    codes = np.asarray(codes, dtype=np.int64).ravel()
+    keep = codes >= 0
+    n = np.bincount(codes[keep], minlength=n_groups)
+    vote_totals = np.zeros(n_groups, dtype=np.int64)
+    np.add.at(vote_totals, codes[keep], arr[keep])
+    hists = [{'counts': {}, 'totals': {}, 'votes': int(vote_totals[i]), 'n': int(n[i])} for i in range(n_groups)]
+    for test in tests:
+        counts, totals = digits.grouped_digit_histogram(codes, n_groups, arr, test)
+        for i, h in enumerate(hists):
+            h['counts'][test] = counts[i]
+            h['totals'][test] = int(totals[i])
+    return hists
+
+def select(h, tests):
+    # The same histogram with only some of its tests
+    return {
+        'counts': {test: h['counts'][test] for test in tests},
+        'totals': {test: h['totals'][test] for test in tests},
+        'votes': h['votes'],
+        'n': h['n'],
+    }
+
+def count_skipped(h):
+    # count_skipped of votes only kept as a histogram: 'first' and 'last' count every
+    # positive value, so the rest of its sample size are zeros
+    if not instrument.ENABLED:
+        return
+    positive = [int(h['counts'][t].sum()) for t in ('first', 'last') if t in h['counts']]
+    if not positive:
+        raise Exception('Skipped values need a first or last digit histogram')
+    zeros = h['n'] - positive[0]
+    for test, counts in h['counts'].items():
+        instrument.count('skipped_zero.{}'.format(test), zeros)
+        instrument.count('skipped_too_small.{}'.format(test), h['n'] - zeros - int(counts.sum()))
+
+def merge(a, b):
+    if a['counts'].keys() != b['counts'].keys():
+        raise Exception('Histograms of different digit tests ({} and {})'.format(list(a['counts']), list(b['counts'])))
+    return {
+        'counts': {test: a['counts'][test] + b['counts'][test] for test in a['counts']},
+        'totals': {test: a['totals'][test] + b['totals'][test] for test in a['totals']},
+        'votes': a['votes'] + b['votes'],
+        'n': a['n'] + b['n'],
+    }
+
+def merge_all(hists, tests=digits.TESTS):
+    h = None
+    for other in hists:
+        h = other if h is None else merge(h, other)
+    return empty(tests) if h is None else h
+
+def merge_groups(a, b):
+    # Merge {key: histogram} dicts key by key
+    merged = dict(a)
+    for key, h in b.items():
+        merged[key] = merge(merged[key], h) if key in merged else h
+    return merged
+
+def dumps(hists):
+    # {key: histogram} as zlib compressed bytes: a json header of keys, tests and
+    # totals, followed by every count as little endian int64
+    keys = list(hists)
+    tests = list(hists[keys[0]]['counts']) if keys else []
+    header = json.dumps({
+        'keys': [list(k) if isinstance(k, tuple) else k for k in keys],
+        'tuple_keys': [isinstance(k, tuple) for k in keys],
+        'tests': tests,
+        'totals': [[hists[k]['totals'][t] for t in tests] for k in keys],
+        'votes': [hists[k]['votes'] for k in keys],
+        'n': [hists[k]['n'] for k in keys],
+    }).encode()
+    counts = [hists[k]['counts'][t] for k in keys for t in tests]
+    body = np.concatenate(counts).astype('<i8').tobytes() if counts else b''
+    return zlib.compress(struct.pack('<I', len(header)) + header + body)
+
+def loads(data):
+    data = zlib.decompress(data)
+    size, = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + size])
+    counts = np.frombuffer(data, dtype='<i8', offset=4 + size).astype(np.int64)
+    widths = [len(digits.DIGIT_RANGES[t]) for t in header['tests']]
+    hists = {}
+    offset = 0
+    for i, key in enumerate(header['keys']):
+        h = {'counts': {}, 'totals': {}, 'votes': header['votes'][i], 'n': header['n'][i]}
+        for test, width, total in zip(header['tests'], widths, header['totals'][i]):
+            h['counts'][test] = counts[offset:offset + width]
+            h['totals'][test] = total
+            offset += width
+        hists[tuple(key) if header['tuple_keys'][i] else key] = h
+    return hists
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STAGES = ('ingest', 'count', 'stats', 'plot', 'render')
+
+# Counters that need an extra pass over the data are only kept while enabled
+ENABLED = False
+_stages = {}
+_counters = {}
+_profile = {'stage': None, 'profiler': None}
+_started = time.time()
+
+def enable(profile_stage=None):
+    global ENABLED
+    if profile_stage is not None and profile_stage not in STAGES:
+        raise Exception('Unknown stage to profile: {}'.format(profile_stage))
+    ENABLED = True
+    _profile['stage'] = profile_stage
+    _profile['profiler'] = cProfile.Profile() if profile_stage else None
+
+@contextlib.contextmanager
+def stage(name):
+    # Time a stage, calls of the same stage add up
+    profiler = _profile['profiler'] if _profile['stage'] == name else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        s = _stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        s['seconds'] += time.perf_counter() - start
+        s['calls'] += 1
+        if profiler:
+            profiler.disable()
+
+def count(name, n=1):
+    _counters[name] = _counters.get(name, 0) + int(n)
+
+def count_skipped(arr, eligible, test):
+    # Values left out of a digit test, zeros apart from the ones too small to have the digit
+    if not ENABLED:
+        return
+    skipped = ~eligible
+    zeros = int((arr[skipped] <= 0).sum())
+    count('skipped_zero.{}'.format(test), zeros)
+    count('skipped_too_small.{}'.format(test), int(skipped.sum()) - zeros)
+
+def peak_rss():
+    # Peak resident set size in bytes of this process and of its finished children (render and simulation workers)
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+def report():
+    rss, children_rss = peak_rss()
+    return {
+        'script': os.path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(_started)),
+        'seconds': time.time() - _started,
+        'stages': {name: dict(s) for name, s in _stages.items()},
+        'counters': dict(_counters),
+        'peak_rss_bytes': rss,
+        'peak_rss_children_bytes': children_rss,
+        'profile_stage': _profile['stage'],
+    }
+
+def finish(path=None, top=25):
+    # Write the run report as json, and the profile of the profiled stage next to it
+    r = report()
+    if _profile['profiler']:
+        stats = pstats.Stats(_profile['profiler'])
+        if path:
+            r['profile_path'] = os.path.splitext(path)[0] + '.{}.prof'.format(_profile['stage'])
+            stats.dump_stats(r['profile_path'])
+        stats.sort_stats('cumulative').print_stats(top)
+    if path:
+        with open(path, 'w') as f:
+            json.dump(r, f, indent=2)
+        print('Saved "{}"'.format(path))
+    return r
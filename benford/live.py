@@ -0,0 +1,64 @@
+import json
+import urllib.request
+import numpy as np
+from benford import digits
+
+def fetch(source):
+    # Results feed from a url or a local file
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source) as r:
+            return json.load(r)
+    with open(source) as f:
+        return json.load(f)
+
+def snapshot(race, region_key='region_key', county_key='county_name'):
+    # {(region_key, county, last_name): votes}
+    keys, votes = [], []
+    for i, region in enumerate(race):
+        for candidate in region['candidates']:
+            keys.append((region.get(region_key), region.get(county_key, i), candidate['last_name']))
+            votes.append(candidate['votes'])
+    return dict(zip(keys, digits.to_array(votes).tolist()))
+
+def _grouped_counts(keys, values, test):
+    # Digit counts and vote totals by (region_key, last_name) of snapshot keys
+    groups = {}
+    codes = np.fromiter((groups.setdefault((k[0], k[2]), len(groups)) for k in keys), dtype=np.int64, count=len(keys))
+    counts, totals = digits.grouped_digit_histogram(codes, len(groups), np.asarray(values, dtype=np.int64), test)
+    return {g: (counts[i], int(totals[i])) for g, i in groups.items()}
+
+def start(race, test):
+    # Histograms of every (region_key, last_name) group of a first snapshot
+    snap = snapshot(race)
+    state = {'test': test, 'snapshot': snap, 'counts': {}, 'totals': {}}
+    for group, (counts, total) in _grouped_counts(list(snap), list(snap.values()), test).items():
+        state['counts'][group] = counts
+        state['totals'][group] = total
+    return state
+
+def update(state, race):
+    # Apply only changed counties to the kept histograms, returns the changed groups
+    new = snapshot(race)
+    old = state['snapshot']
+    changed = [k for k in new.keys() | old.keys() if old.get(k) != new.get(k)]
+    state['snapshot'] = new
+    if not changed:
+        return set()
+
+    # Missing counties count as 0, which is never counted
+    removed = _grouped_counts(changed, [old.get(k, 0) for k in changed], state['test'])
+    added = _grouped_counts(changed, [new.get(k, 0) for k in changed], state['test'])
+    for group in removed:
+        counts = state['counts'].get(group, 0) - removed[group][0] + added[group][0]
+        state['counts'][group] = counts
+        state['totals'][group] = state['totals'].get(group, 0) - removed[group][1] + added[group][1]
+    return set(removed)
+
+def candidate_counts(state, candidate, regions=None):
+    # Counts and total of a candidate summed over regions, or all regions if None
+    counts, total = 0, 0
+    for (region, c), group_counts in state['counts'].items():
+        if c == candidate and (regions is None or region in regions):
+            counts = counts + group_counts
+            total += state['totals'][(region, c)]
+    return counts, total
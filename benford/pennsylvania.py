@@ -0,0 +1,102 @@
+import numpy as np
+from benford import cache, digits, histogram, instrument, table
+
+CANDIDATES = ['BIDEN', 'TRUMP', 'JORGENSEN']
+VOTE_COLUMNS = ['Votes', 'Mail Votes', 'Provisional Votes']
+COUNTED_COLUMNS = VOTE_COLUMNS + ['Not Mail Votes']
+# Digit tests counted while streaming, every test a run can ask for afterwards
+STREAM_TESTS = digits.SCRIPT_TESTS
+
+def candidate_codes(names):
+    # Index in CANDIDATES of each 'Candidate Name', by the first uppercase name it contains
+    codes = []
+    for name in names:
+        found = [(name.find(c), i) for i, c in enumerate(CANDIDATES) if c in name]
+        if not found:
+            raise Exception('Unknown candidate name')
+        codes.append(min(found)[1])
+    return np.array(codes, dtype=np.int64)
+
+def read_csv(path):
+    # Vote columns are parsed as integers at read time
+    import pandas as pd
+    return pd.read_csv(
+        path,
+        usecols=['County Name', 'Candidate Name'] + VOTE_COLUMNS,
+        thousands=',',
+        dtype={c: np.int64 for c in VOTE_COLUMNS}
+    )
+
+def read_tables(path):
+    df = read_csv(path)
+    return {'votes': table.table(
+        {c: df[c].to_numpy() for c in VOTE_COLUMNS},
+        {'County Name': df['County Name'].tolist(), 'Candidate Name': df['Candidate Name'].tolist()}
+    )}
+
+def vote_columns(votes, candidates):
+    # Vote columns as int64 arrays, plus 'Not Mail Votes' and 'Candidate' codes into CANDIDATES
+    columns = {c: np.asarray(votes[c], dtype=np.int64) for c in VOTE_COLUMNS}
+    columns['Not Mail Votes'] = columns['Votes'] - columns['Mail Votes'] - columns['Provisional Votes']
+    columns['Candidate'] = candidates
+    return columns
+
+def table_columns(t):
+    return vote_columns(t['columns'], candidate_codes(t['labels']['Candidate Name'])[t['columns']['Candidate Name']])
+
+def read_county_votes(path, use_cache=False):
+    # A cached file is read without pandas
+    tables = cache.cached_tables(path, read_tables) if use_cache else read_tables(path)
+    return table_columns(tables['votes'])
+
+def read_chunks(path, chunk_rows):
+    # Only the candidate and vote columns, votes parsed straight to int64 and
+    # candidate names as a categorical so no string is kept per row
+    import pandas as pd
+    return pd.read_csv(
+        path,
+        usecols=['Candidate Name'] + VOTE_COLUMNS,
+        thousands=',',
+        dtype=dict({c: np.int64 for c in VOTE_COLUMNS}, **{'Candidate Name': 'category'}),
+        chunksize=chunk_rows
+    )
+
+def stream_county_votes(path, chunk_rows, tests=STREAM_TESTS):
+    # Histograms of every candidate for each counted column, updated one chunk at a
+    # time so memory depends on chunk_rows and not on the size of the file
+    hists = {column: [histogram.empty(tests) for _ in CANDIDATES] for column in COUNTED_COLUMNS}
+    rows = 0
+    for chunk in read_chunks(path, chunk_rows):
+        names = chunk['Candidate Name'].cat
+        # Missing names have code -1, which picks the appended -1 and skips the row
+        lookup = np.append(candidate_codes(list(names.categories)), -1)
+        columns = vote_columns(chunk, lookup[names.codes.to_numpy()])
+        for column, merged in hists.items():
+            counted = histogram.grouped(columns['Candidate'], len(CANDIDATES), columns[column], tests)
+            hists[column] = [histogram.merge(a, b) for a, b in zip(merged, counted)]
+        rows += len(chunk)
+        instrument.count('chunks_ingested')
+    return {'hists': hists, 'rows': rows}
+
+def count_candidates(columns, column, test):
+    # Digit counts and vote totals of every candidate for one vote column, of loaded
+    # columns or of histograms counted by stream_county_votes
+    if 'hists' in columns:
+        hists = columns['hists'][column]
+        return (
+            {c: hists[i]['counts'][test] for i, c in enumerate(CANDIDATES)},
+            {c: hists[i]['totals'][test] for i, c in enumerate(CANDIDATES)}
+        )
+    counts, totals = digits.grouped_digit_histogram(columns['Candidate'], len(CANDIDATES), columns[column], test)
+    return (
+        {c: counts[i] for i, c in enumerate(CANDIDATES)},
+        {c: int(totals[i]) for i, c in enumerate(CANDIDATES)}
+    )
+
+def count_final_digits(columns, column):
+    # Last, second to last and last two digit counts of every candidate for one vote column
+    if 'hists' in columns:
+        hists = columns['hists'][column]
+        return {c: tuple(hists[i]['counts'][t] for t in ('last', 'plast', 'last_two')) for i, c in enumerate(CANDIDATES)}
+    last, plast, last_two = digits.grouped_final_digits(columns['Candidate'], len(CANDIDATES), columns[column])
+    return {c: (last[i], plast[i], last_two[i]) for i, c in enumerate(CANDIDATES)}
@@ -0,0 +1,103 @@
+import numpy as np
+from benford import stats
+
+DRAWS = 10000 # Default number of permutations per pair
+MAX_NULLS = 256 # Permuted statistics kept in memory, the least recently used are dropped past it (None for all)
+
+# Sorted permuted statistics by (pooled digit counts, size of the first group, draws), least recently
+# used first. A permutation only depends on the groups' digit counts, which the scripts already keep
+# per group, so these are cached rather than the groups' digit arrays
+_nulls = {}
+
+def homogeneity(a, b):
+    # Chi-square statistic of two digit count rows being drawn from one distribution, over the last axis
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    pooled = a + b
+    n_a = a.sum(axis=-1, keepdims=True)
+    n_b = b.sum(axis=-1, keepdims=True)
+    expected_a = pooled * n_a / (n_a + n_b)
+    expected_b = pooled - expected_a
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = (a - expected_a) ** 2 / expected_a + (b - expected_b) ** 2 / expected_b
+    return np.where(pooled > 0, terms, 0).sum(axis=-1)
+
+def _permute(pooled, n_a, draws):
+    # Shuffling which values belong to the first group only changes its digit counts, which
+    # follow a multivariate hypergeometric distribution: every permutation is one draw of it,
+    # a (draws x digits) matrix whatever the number of values
+    rng = np.random.default_rng([n_a, draws] + pooled.tolist())
+    a = rng.multivariate_hypergeometric(pooled, n_a, size=draws)
+    return np.sort(homogeneity(a, pooled - a))
+
+def permuted(pooled, n_a, draws=DRAWS):
+    # Sorted statistics of draws permutations of the pooled digit counts, n_a of them in the first group
+    key = (tuple(int(c) for c in pooled), int(n_a), draws)
+    null = _nulls.pop(key) if key in _nulls else _permute(np.array(key[0], dtype=np.int64), key[1], draws)
+    _nulls[key] = null
+    while MAX_NULLS is not None and len(_nulls) > MAX_NULLS:
+        del _nulls[next(iter(_nulls))]
+    return null
+
+def compare(a, b, draws=DRAWS):
+    # Permutation test of each row of a against the same row of b, (pairs x digits) count matrices
+    a = np.atleast_2d(np.asarray(a, dtype=np.int64))
+    b = np.atleast_2d(np.asarray(b, dtype=np.int64))
+    pooled = a + b
+    n_a, n_b = a.sum(axis=1), b.sum(axis=1)
+    chi2 = homogeneity(a, b)
+    both = (n_a > 0) & (n_b > 0)
+    p_value = np.full(len(a), np.nan)
+    # One chi-square survival call per number of degrees of freedom, digits seen in either group less one
+    df = np.maximum((pooled > 0).sum(axis=1) - 1, 1)
+    for d in np.unique(df[both]):
+        rows = both & (df == d)
+        p_value[rows] = stats.chi2_sf(chi2[rows], int(d))
+    permutation_p = np.full(len(a), np.nan)
+    for i in np.flatnonzero(both):
+        null = permuted(pooled[i], n_a[i], draws)
+        # Share of permutations at least as far apart, the observed split counting as one of them
+        at_least = len(null) - np.searchsorted(null, chi2[i] * (1 - 1e-9))
+        permutation_p[i] = (1 + at_least) / (1 + len(null))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mad = np.abs(a / n_a[:, None] - b / n_b[:, None]).mean(axis=1)
+    return {
+        'n_a': n_a,
+        'n_b': n_b,
+        'chi2': chi2,
+        'p_value': p_value,
+        'mad': mad,
+        'permutation_p': permutation_p,
+    }
+
+def vote_type_pairs(counts):
+    # Names and count matrices of every pair of vote types within each group,
+    # counts is {group: {vote type: digit counts}} of vote types that don't overlap
+    names, a, b = [], [], []
+    for group, vote_types in counts.items():
+        group = group if isinstance(group, tuple) else (group,)
+        items = list(vote_types.items())
+        for i, (type_a, counts_a) in enumerate(items):
+            for type_b, counts_b in items[i + 1:]:
+                names.append(group + (type_a, type_b))
+                a.append(counts_a)
+                b.append(counts_b)
+    return names, a, b
+
+def report(names, results):
+    # Text table with one line per pair
+    names = [n if isinstance(n, str) else ' - '.join(map(str, n)) for n in names]
+    width = max([len('Pair')] + [len(n) for n in names])
+    lines = ['{:<{}} {:>7} {:>7} {:>9} {:>8} {:>8} {:>8}'.format('Pair', width, 'Size A', 'Size B', 'Chi2', 'p', 'MAD', 'Perm p')]
+    for i, name in enumerate(names):
+        lines.append('{:<{}} {:>7,} {:>7,} {:>9.2f} {:>8.4f} {:>8.4f} {:>8.4f}'.format(
+            name,
+            width,
+            results['n_a'][i],
+            results['n_b'][i],
+            results['chi2'][i],
+            results['p_value'][i],
+            results['mad'][i],
+            results['permutation_p'][i]
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,192 @@
+import os
+import collections
+import numpy as np
+from benford import cache, clarity, digits, pennsylvania, race_index, reference, render, simulate, sources, stats, table
+
+# Source of each dataset relative to the repository root, and its parser
+SOURCES = {
+    'nationwide': ('counties_president.json', race_index.read_tables),
+    'georgia': (os.path.join('Georgia-Election', 'detail.xml'), clarity.read_tables),
+    'pennsylvania': (os.path.join('Pennsylvania-Election', 'pennsylvania_county_votes.csv'), pennsylvania.read_tables),
+}
+# Fields a query can filter on, and the value used when a query leaves one out (None for all)
+FIELDS = ('grouping', 'state', 'contest', 'candidate', 'vote_type')
+DEFAULTS = {'grouping': 'county', 'vote_type': 'Votes'}
+MAX_DRAWS = 100000 # Most simulated samples a query can ask for
+
+def group_votes(t, names, column='votes'):
+    # Votes of every combination of the encoded columns names present in a table
+    votes = np.asarray(t['columns'][column], dtype=np.int64)
+    return {
+        table.decode_codes(t, names, code): votes[rows]
+        for code, rows in table.group_rows(table.combined_codes(t, names))
+    }
+
+def summed_votes(t, names, column='votes'):
+    # One total per combination of the encoded columns names, like group_votes after summing repeated keys
+    keys, inverse = np.unique(table.combined_codes(t, names), return_inverse=True)
+    totals = np.bincount(inverse, weights=t['columns'][column], minlength=len(keys)).astype(np.int64)
+    return [table.decode_codes(t, names, k) for k in keys], totals
+
+def candidate_keyed(t, column):
+    # Table with candidates relabeled by sources.candidate_key, so 'trump' matches every dataset's spelling
+    codes, labels = sources.relabel(t['columns'][column], t['labels'][column], sources.candidate_key)
+    return {'columns': dict(t['columns'], **{column: codes}), 'labels': dict(t['labels'], **{column: labels})}
+
+def nationwide_groups(tables):
+    groups = {}
+    for grouping, name in (('county', 'counties'), ('state', 'states')):
+        for (state, candidate), votes in group_votes(candidate_keyed(tables[name], 'candidate'), ['region', 'candidate']).items():
+            groups[(grouping, state, None, candidate, 'Votes')] = votes
+    return groups
+
+def georgia_groups(tables):
+    t = candidate_keyed(tables['detail'], 'choice')
+    groups = {}
+    for (contest, choice, vote_type), votes in group_votes(t, ['contest', 'choice', 'vote_type']).items():
+        groups[('county', 'GA', contest, choice, vote_type)] = votes
+    # Every vote type of a county summed, comparable with other sources' county totals
+    keys, totals = summed_votes(t, ['contest', 'choice', 'region'])
+    by_choice = collections.defaultdict(list)
+    for (contest, choice, _), total in zip(keys, totals):
+        by_choice[(contest, choice)].append(total)
+    for (contest, choice), votes in by_choice.items():
+        groups[('county', 'GA', contest, choice, 'Votes')] = np.array(votes, dtype=np.int64)
+    return groups
+
+def pennsylvania_groups(tables):
+    columns = pennsylvania.table_columns(tables['votes'])
+    groups = {}
+    for i, candidate in enumerate(pennsylvania.CANDIDATES):
+        rows = columns['Candidate'] == i
+        for column in pennsylvania.COUNTED_COLUMNS:
+            groups[('county', 'PA', None, sources.candidate_key(candidate), column)] = columns[column][rows]
+    return groups
+
+GROUPS = {'nationwide': nationwide_groups, 'georgia': georgia_groups, 'pennsylvania': pennsylvania_groups}
+
+def build_index(paths, use_cache=True):
+    # Votes of every (grouping, state, contest, candidate, vote type) of each dataset, read once
+    index = {}
+    for dataset, path in paths.items():
+        read = SOURCES[dataset][1]
+        tables = cache.cached_tables(path, read) if use_cache else read(path)
+        index[dataset] = GROUPS[dataset](tables)
+    return index
+
+def values(index):
+    # Distinct values of every field of each dataset, what queries can ask for
+    return {
+        dataset: {
+            field: sorted({key[i] for key in groups if key[i] is not None})
+            for i, field in enumerate(FIELDS)
+        }
+        for dataset, groups in index.items()
+    }
+
+def normalize(dataset, params):
+    # Query parameters with defaults filled in, as a hashable cache key. Names match
+    # case insensitively, so they are lowercased to share cached results
+    if dataset not in SOURCES:
+        raise Exception('Unknown dataset ({})'.format(dataset))
+    unknown = set(params) - set(FIELDS) - {'test', 'draws'}
+    if unknown:
+        raise Exception('Unknown query parameters ({})'.format(', '.join(sorted(unknown))))
+    test = params.get('test', 'first')
+    if test not in digits.TESTS:
+        raise Exception('Unknown digit test ({})'.format(test))
+    draws = int(params['draws']) if params.get('draws') else None
+    if draws is not None and not 0 < draws <= MAX_DRAWS:
+        raise Exception('draws must be between 1 and {}'.format(MAX_DRAWS))
+    filters = tuple((field, params.get(field, DEFAULTS.get(field))) for field in FIELDS)
+    filters = tuple((field, None if value is None else value.lower()) for field, value in filters)
+    return dataset, filters, test, draws
+
+def select(groups, filters):
+    # Keys and votes of the groups matching every normalized filter
+    wanted = [(i, value) for i, (_, value) in enumerate(filters) if value is not None]
+    keys, votes = [], []
+    for key, arr in groups.items():
+        if all(key[i] is not None and str(key[i]).lower() == value for i, value in wanted):
+            keys.append(key)
+            votes.append(arr)
+    return keys, votes
+
+def _plain(value):
+    # numpy scalars as json values, nan as null
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+def query(index, dataset, filters, test, draws=None):
+    # Digit counts, proportions and conformity of every vote matching the filters
+    if dataset not in index:
+        raise Exception('Dataset not loaded ({})'.format(dataset))
+    keys, votes = select(index[dataset], filters)
+    if not keys:
+        raise Exception('No votes match {}'.format(', '.join('{}={}'.format(f, v) for f, v in filters if v is not None)))
+    votes = np.concatenate(votes)
+    counts, total = digits.digit_histogram(votes, test)
+    n = int(counts.sum())
+    results = stats.conformity(counts, test)
+    if draws:
+        results['mc_p_value'] = simulate.empirical_p_values(counts, test, draws, 1)
+    result = {
+        'dataset': dataset,
+        # Names as the dataset spells them where every matched group shares one
+        'filters': {f: labels.pop() if len(labels) == 1 else v for (f, v), labels in zip(filters, map(set, zip(*keys)))},
+        'test': test,
+        'draws': draws,
+        'groups': len(keys),
+        'values': len(votes),
+        'votes': int(votes.sum()),
+        'eligible_votes': total,
+        'digits': list(reference.index(test)),
+        'counts': counts.tolist(),
+        'proportions': (counts / n).tolist() if n else None,
+        'expected': reference.probabilities(test).tolist(),
+        'stats': {name: _plain(r[0]) for name, r in results.items() if name != 'z'},
+        'z': [_plain(z) for z in results['z'][0]],
+    }
+    if draws and n:
+        result['band'] = [b.tolist() for b in simulate.bands(n, test, draws)]
+    return result
+
+def result_spec(result):
+    # Plot of a query result, drawn like the scripts' Benford's law plots
+    title = ' '.join(str(v) for f, v in result['filters'].items() if v is not None and f != 'grouping')
+    title = '{} {} digit test by {} Vote Count - {:,}, Size - {:,}'.format(
+        title, result['test'], result['filters']['grouping'], result['eligible_votes'], result['stats']['n']
+    )
+    band = result.get('band')
+    return render.plot_spec(
+        title,
+        {'Actual value': result['proportions'] or [0] * len(result['digits'])},
+        result['digits'],
+        ['b'],
+        reference=result['expected'],
+        band=band,
+        xlabel='Digit Value',
+        ylabel='Proportion',
+        legend=['Benford\'s law', '95% band', 'Actual value'] if band else ['Benford\'s law', 'Actual value'],
+        rot=45
+    )
+
+def lru(max_items):
+    # Least recently used cache, the oldest entry is evicted past max_items
+    return {'items': collections.OrderedDict(), 'max': max_items, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+def cached(c, key, compute):
+    if key in c['items']:
+        c['items'].move_to_end(key)
+        c['hits'] += 1
+        return c['items'][key]
+    c['misses'] += 1
+    value = compute()
+    c['items'][key] = value
+    while len(c['items']) > c['max']:
+        c['items'].popitem(last=False)
+        c['evictions'] += 1
+    return value
+
+def cache_stats(c):
+    return {'size': len(c['items']), 'max': c['max'], 'hits': c['hits'], 'misses': c['misses'], 'evictions': c['evictions']}
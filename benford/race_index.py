@@ -0,0 +1,53 @@
+import json
+import numpy as np
+from benford import digits, table
+
+def race_table(race, region_key='region_key', county_key='county_name'):
+    # One row per (region, candidate) with dictionary encoded names
+    b = table.builder(['region', 'county', 'candidate'], ['votes'])
+    for i, region in enumerate(race):
+        for candidate in region['candidates']:
+            table.append(
+                b,
+                (region.get(region_key), region.get(county_key, i), candidate['last_name']),
+                (digits.to_int(candidate['votes']),)
+            )
+    return table.build(b)
+
+def read_tables(path):
+    with open(path) as f:
+        election_data = json.load(f)
+    return {
+        'counties': race_table(election_data['map_county_data']['election']['race']),
+        'states': race_table(election_data['top_level_ru']),
+    }
+
+def index_table(t):
+    # Group votes by (region_key, last_name)
+    regions = t['labels']['region']
+    candidates = t['labels']['candidate']
+    votes = t['columns']['votes']
+    index = {}
+    for code, rows in table.group_rows(table.combined_codes(t, ['region', 'candidate'])):
+        r, c = divmod(int(code), len(candidates))
+        index[(regions[r], candidates[c])] = votes[rows]
+    return index
+
+def build_race_index(race, region_key='region_key'):
+    return index_table(race_table(race, region_key))
+
+def regions(index):
+    return sorted({r for r, _ in index})
+
+def candidates(index):
+    return sorted({c for _, c in index})
+
+def lookup(index, candidate, regions=None):
+    # Votes of a candidate in the given regions, or in all regions if None
+    if regions is None:
+        arrs = [v for (_, c), v in index.items() if c == candidate]
+    else:
+        arrs = [index[(r, candidate)] for r in regions if (r, candidate) in index]
+    if not arrs:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(arrs)
@@ -0,0 +1,46 @@
+from functools import lru_cache
+import numpy as np
+from benford import digits
+
+def _frozen(arr):
+    arr.setflags(write=False)
+    return arr
+
+@lru_cache(maxsize=None)
+def nth_digit(n):
+    # P(nth digit = d) = sum over the first n-1 digits k of log10(1 + 1/(10k + d))
+    if n < 1:
+        raise Exception('Digit position must be at least 1 ({})'.format(n))
+    if n == 1:
+        return _frozen(np.log10(1 + 1 / np.arange(1, 10)))
+    k = np.arange(10 ** (n-2), 10 ** (n-1), dtype=np.float64)
+    d = np.arange(10, dtype=np.float64)
+    return _frozen(np.log10(1 + 1 / (10 * k[:, None] + d[None, :])).sum(axis=0))
+
+@lru_cache(maxsize=None)
+def first_digits(n):
+    # P(first n digits = d) = log10(1 + 1/d) for d in 10^(n-1)..10^n-1
+    d = np.arange(10 ** (n-1), 10 ** n, dtype=np.float64)
+    return _frozen(np.log10(1 + 1 / d))
+
+def uniform(size):
+    return _frozen(np.full(size, 1 / size))
+
+# Reference distribution of each digit test in digits.TESTS
+_REFERENCES = {
+    'first': lambda: nth_digit(1),
+    'second': lambda: nth_digit(2),
+    'first_two': lambda: first_digits(2),
+    'first_three': lambda: first_digits(3),
+    'last': lambda: uniform(10),
+    'plast': lambda: uniform(10),
+    'last_two': lambda: uniform(100),
+}
+
+def probabilities(test):
+    if test not in _REFERENCES:
+        raise Exception('Unknown digit test ({})'.format(test))
+    return _REFERENCES[test]()
+
+def index(test):
+    return digits.DIGIT_RANGES[test]
@@ -0,0 +1,333 @@
+import io
+import os
+import json
+import math
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from textwrap import wrap
+import numpy as np
+from benford import instrument
+
+# pandas and matplotlib are imported on first draw, counting and statistics never need them
+_plt = None
+
+# Bump when drawing changes so cached jpgs are redone
+STYLE_VERSION = 1
+# Spec hash of every saved jpg by path, kept in the directory the plots are saved from
+MANIFEST = '.render-manifest.json'
+
+GRID_PANEL_SIZE = (2.6, 2.0) # Inches per panel of grid figures
+GRID_PAGE = 24 # Panels per page of pdf grids
+
+# Figures waiting to be saved by flush()
+_queue = []
+# Grids collecting panels until plot_grids(), by path
+_grids = {}
+# Reusable headless figures for fast rendering, keyed by plot layout
+_templates = {}
+
+def plot_spec(title, data, index, colors, path=None, reference=None, band=None, xlabel=None, ylabel=None, legend=None, rot=None, hlines=(), edgecolor=None):
+    # Everything needed to draw a bar plot, plain values so it can be sent to other processes
+    return {
+        'title': title,
+        'data': {k: list(map(float, v)) for k, v in data.items()},
+        'index': list(index),
+        'colors': list(colors),
+        'path': path,
+        'reference': None if reference is None else list(map(float, reference)),
+        'band': None if band is None else [list(map(float, b)) for b in band],
+        'xlabel': xlabel,
+        'ylabel': ylabel,
+        'legend': legend,
+        'rot': rot,
+        'hlines': list(hlines),
+        'edgecolor': edgecolor,
+    }
+
+def grid_spec(title, path=None, ncols=None, sharey=True):
+    # Plot specs laid out as panels of one figure sharing axes, labels and legend,
+    # a .pdf path gets pages of GRID_PAGE panels
+    return {'title': title, 'panels': [], 'path': path, 'ncols': ncols, 'sharey': sharey}
+
+def final_digits_spec(title, last, plast, colors, path=None):
+    # Last and second to last digit counts against their means
+    return plot_spec(
+        title,
+        {'Last Digit': last, 'Second Last Digit': plast},
+        range(10),
+        colors,
+        path=path,
+        xlabel='Number',
+        ylabel='Frequency',
+        legend=['Mean Last Digit', 'Mean 2nd Last Digit', 'Last Digit', 'Second Last Digit'],
+        hlines=[(last.mean(), 'k'), (plast.mean(), 'gray')],
+        edgecolor='k'
+    )
+
+def pyplot():
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+def show():
+    # Interactive figures only exist once pyplot was needed
+    if _plt is not None:
+        _plt.show()
+
+def _draw_on(ax, spec):
+    import pandas as pd
+    df = pd.DataFrame(spec['data'], index=spec['index'])
+    kwargs = {'color': spec['colors']}
+    if spec['rot'] is not None:
+        kwargs['rot'] = spec['rot']
+    if spec['edgecolor'] is not None:
+        kwargs['edgecolor'] = spec['edgecolor']
+    p = df.plot.bar(ax=ax, **kwargs)
+    reference = None
+    if spec['reference'] is not None:
+        reference, = p.plot(range(len(spec['reference'])), spec['reference'], '.-', color='y', markerfacecolor='w', markeredgecolor='gray')
+    band = None
+    if spec['band'] is not None:
+        band = _fill_band(p, spec['band'])
+    hlines = [p.hlines(y, -1, 10, linestyles='dashed', color=color) for y, color in spec['hlines']]
+    p.set_title('\n'.join(wrap(spec['title'], 60)))
+    if spec['xlabel'] is not None:
+        p.set_xlabel(spec['xlabel'])
+    if spec['ylabel'] is not None:
+        p.set_ylabel(spec['ylabel'])
+    if spec['legend'] is not None:
+        p.legend(spec['legend'])
+    return p, reference, band, hlines
+
+def _fill_band(p, band):
+    # Confidence band around the reference line
+    low, high = band
+    return p.fill_between(range(len(low)), low, high, color='y', alpha=0.25, linewidth=0, zorder=0.5)
+
+def draw(spec):
+    plt = pyplot()
+    if 'panels' in spec:
+        return _draw_grid(plt.figure(), spec, spec['panels'])
+    plt.figure()
+    return _draw_on(plt.gca(), spec)[0]
+
+def _draw_panel(ax, spec):
+    # Same bars, reference, band and mean lines as _draw_on, drawn straight on the axes
+    x = np.arange(len(spec['index']))
+    width = 0.8 / len(spec['data'])
+    bars = [
+        ax.bar(x - 0.4 + width * (i + 0.5), values, width, color=spec['colors'][i % len(spec['colors'])], edgecolor=spec['edgecolor'])
+        for i, values in enumerate(spec['data'].values())
+    ]
+    # Legend order of _draw_on: lines, then filled areas and hlines, then bars
+    handles = []
+    if spec['reference'] is not None:
+        handles += ax.plot(x, spec['reference'], '.-', color='y', markerfacecolor='w', markeredgecolor='gray')
+    if spec['band'] is not None:
+        handles.append(_fill_band(ax, spec['band']))
+    handles += [ax.axhline(y, linestyle='dashed', color=color) for y, color in spec['hlines']]
+    ax.set_title('\n'.join(wrap(spec['title'], 28)), fontsize='x-small')
+    ax.set_xticks(x)
+    ax.set_xticklabels(spec['index'], fontsize='x-small', rotation=spec['rot'] or 0)
+    ax.tick_params(axis='y', labelsize='x-small')
+    return handles + bars
+
+def _draw_grid(fig, spec, panels):
+    ncols = spec['ncols'] or max(1, math.ceil(math.sqrt(len(panels))))
+    nrows = max(1, math.ceil(len(panels) / ncols))
+    width, height = GRID_PANEL_SIZE[0] * ncols, GRID_PANEL_SIZE[1] * nrows + 1.3
+    fig.set_size_inches(width, height)
+    axes = fig.subplots(nrows, ncols, sharex=True, sharey=spec['sharey'], squeeze=False)
+    # Margins in inches, room for the grid title, legend and shared axis labels
+    fig.subplots_adjust(left=0.6 / width, right=1 - 0.2 / width, bottom=0.6 / height, top=1 - 1.2 / height, wspace=0.25, hspace=0.55)
+    for ax in axes.flat[len(panels):]:
+        ax.set_visible(False)
+    handles = [_draw_panel(ax, panel) for ax, panel in zip(axes.flat, panels)]
+    # Title, axis labels and legend once for the whole grid
+    fig.suptitle('\n'.join(wrap(spec['title'], 30 * ncols)), y=1 - 0.1 / height, va='top')
+    if panels and panels[0]['xlabel'] is not None:
+        fig.text(0.5, 0.01, panels[0]['xlabel'], ha='center')
+    if panels and panels[0]['ylabel'] is not None:
+        fig.text(0.005, 0.5, panels[0]['ylabel'], va='center', rotation='vertical')
+    if panels and panels[0]['legend'] is not None:
+        # As in single plots, labels go to the first handles and the rest go unlabelled
+        labels = panels[0]['legend']
+        fig.legend(
+            handles[0][:len(labels)], labels, loc='upper center', bbox_to_anchor=(0.5, 1 - 0.45 / height),
+            ncol=len(labels), fontsize='small', frameon=False
+        )
+    return axes
+
+def _save_grid(spec):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    if not spec['path'].lower().endswith('.pdf'):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        _draw_grid(fig, spec, spec['panels'])
+        fig.savefig(spec['path'])
+        return spec['path']
+    from matplotlib.backends.backend_pdf import PdfPages
+    with PdfPages(spec['path']) as pdf:
+        for start in range(0, len(spec['panels']), GRID_PAGE):
+            fig = Figure()
+            FigureCanvasAgg(fig)
+            _draw_grid(fig, spec, spec['panels'][start:start + GRID_PAGE])
+            pdf.savefig(fig)
+    return spec['path']
+
+def _layout_key(spec):
+    # Everything but bar heights, reference values, hline values and title
+    return (
+        tuple(spec['data']),
+        tuple(spec['index']),
+        tuple(spec['colors']),
+        spec['reference'] is not None,
+        spec['band'] is not None,
+        tuple(color for _, color in spec['hlines']),
+        spec['xlabel'],
+        spec['ylabel'],
+        None if spec['legend'] is None else tuple(spec['legend']),
+        spec['rot'],
+        spec['edgecolor'],
+    )
+
+def _fast_save(spec):
+    # Reuse a figure with the same layout, only updating what changes between plots
+    key = _layout_key(spec)
+    if key not in _templates:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        _templates[key] = (fig,) + _draw_on(fig.add_subplot(), spec)
+        fig.savefig(spec['path'])
+        return spec['path']
+
+    fig, p, reference, band, hlines = _templates[key]
+    for bars, heights in zip(p.containers, spec['data'].values()):
+        for bar, height in zip(bars, heights):
+            bar.set_height(height)
+    if reference is not None:
+        reference.set_ydata(spec['reference'])
+    # Old artists must not hold stale values when limits are recomputed
+    for collection, (y, _) in zip(hlines, spec['hlines']):
+        collection.set_segments([[(-1, y), (10, y)]])
+    if band is not None:
+        band.remove()
+    p.relim()
+    for y, _ in spec['hlines']:
+        p.update_datalim([(-1, y), (10, y)])
+    if band is not None:
+        band = _fill_band(p, spec['band'])
+        _templates[key] = fig, p, reference, band, hlines
+    p.autoscale_view()
+    p.set_title('\n'.join(wrap(spec['title'], 60)))
+    fig.savefig(spec['path'])
+    return spec['path']
+
+def save(spec, fast=False):
+    os.makedirs(os.path.dirname(spec['path']) or '.', exist_ok=True)
+    if 'panels' in spec:
+        return _save_grid(spec)
+    if fast:
+        return _fast_save(spec)
+    draw(spec)
+    pyplot().savefig(spec['path'])
+    pyplot().close()
+    return spec['path']
+
+def png(spec):
+    # Figure drawn headless and returned as png bytes instead of being saved
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    if 'panels' in spec:
+        _draw_grid(fig, spec, spec['panels'])
+    else:
+        _draw_on(fig.add_subplot(), spec)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+def fast_save(spec):
+    return save(spec, fast=True)
+
+def plot(spec, save_fig=False, grid=None):
+    # Queue the figure to be saved, or draw it now to be shown. With a grid spec
+    # it's a panel of the grid with the same path instead, laid out by plot_grids()
+    if grid is not None:
+        _grids.setdefault(grid['path'], grid)['panels'].append(spec)
+    elif save_fig:
+        _queue.append(spec)
+    else:
+        draw(spec)
+
+def plot_grids(save_fig=False):
+    for grid in _grids.values():
+        plot(grid, save_fig)
+    _grids.clear()
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _saved(path):
+    instrument.count('figures_rendered')
+    instrument.count('bytes_written', os.path.getsize(path))
+    print('Saved "{}"'.format(path))
+
+def spec_hash(spec, fast=False):
+    # Everything that ends up in the jpg but its path
+    content = {k: v for k, v in spec.items() if k != 'path'}
+    content['style'] = (STYLE_VERSION, fast)
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+def read_manifest(path=MANIFEST):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(manifest, path=MANIFEST):
+    # Sorted so the committed manifest diffs cleanly
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def render_all(specs, workers=None, fast=False, cache=False):
+    # Save figures in a pool of headless worker processes
+    if cache:
+        # Only figures whose spec changed since they were last saved, or whose jpg is gone
+        manifest = read_manifest()
+        hashes = [spec_hash(spec, fast) for spec in specs]
+        changed = [
+            (spec, h) for spec, h in zip(specs, hashes)
+            if manifest.get(os.path.relpath(spec['path'])) != h or not os.path.exists(spec['path'])
+        ]
+        skipped = len(specs) - len(changed)
+        instrument.count('figures_skipped', skipped)
+        if skipped:
+            print('{} unchanged figures skipped'.format(skipped))
+        render_all([spec for spec, _ in changed], workers, fast)
+        if changed:
+            manifest.update((os.path.relpath(spec['path']), h) for spec, h in changed)
+            write_manifest(manifest)
+        return
+    workers = workers or os.cpu_count() or 1
+    save_fn = fast_save if fast else save
+    if workers == 1 or len(specs) <= 1:
+        for path in map(save_fn, specs):
+            _saved(path)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(specs) // (workers * 4))
+        for path in pool.map(save_fn, specs, chunksize=chunksize):
+            _saved(path)
+
+def flush(workers=None, fast=False, cache=False):
+    render_all(_queue, workers, fast, cache)
+    _queue.clear()
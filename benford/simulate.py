@@ -0,0 +1,70 @@
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from benford import reference
+
+BAND_LEVEL = 0.95 # Coverage of the confidence bands
+DRAWS = 10000 # Default number of simulated samples per sample size
+MAX_SIMULATIONS = None # Simulations kept in memory, the least recently used is dropped past it (None for all)
+
+# Simulations by (sample size, test, draws), least recently used first
+_simulations = {}
+
+def _keep(key, result):
+    _simulations[key] = result
+    while MAX_SIMULATIONS is not None and len(_simulations) > MAX_SIMULATIONS:
+        del _simulations[next(iter(_simulations))]
+
+def _simulate(n, test, draws):
+    # Draw samples of size n from the reference distribution in one batch
+    p = reference.probabilities(test)
+    if n == 0:
+        nan = np.full(len(p), np.nan)
+        return nan, nan, np.zeros(0)
+    rng = np.random.default_rng([n, draws, zlib.crc32(test.encode())])
+    samples = rng.multinomial(n, p, size=draws) / n
+    # Nearest rank quantiles, sorting once is much faster than np.quantile here
+    ranks = np.rint(np.array([(1 - BAND_LEVEL) / 2, (1 + BAND_LEVEL) / 2]) * (draws - 1)).astype(np.int64)
+    low, high = np.sort(samples, axis=0)[ranks]
+    mads = np.sort(np.abs(samples - p).mean(axis=1))
+    return low, high, mads
+
+def simulate(n, test, draws=DRAWS):
+    # (band low, band high, sorted simulated MADs) for samples of size n
+    key = (int(n), test, draws)
+    result = _simulations.pop(key) if key in _simulations else _simulate(*key)
+    _keep(key, result)
+    return result
+
+def simulate_many(sizes, test, draws=DRAWS, workers=None):
+    # Simulate every sample size not cached yet, spread over a process pool
+    missing = sorted({int(n) for n in sizes} - {n for n, t, d in _simulations if t == test and d == draws})
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(missing) <= 1:
+        for n in missing:
+            simulate(n, test, draws)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(_simulate, missing, [test] * len(missing), [draws] * len(missing))
+        for n, result in zip(missing, results):
+            _keep((n, test, draws), result)
+
+def bands(n, test, draws=DRAWS):
+    low, high, _ = simulate(n, test, draws)
+    return low, high
+
+def empirical_p_values(counts, test, draws=DRAWS, workers=None):
+    # Share of simulated samples of the same size with a MAD at least as large as each row's
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+    n = counts.sum(axis=1).astype(np.int64)
+    simulate_many(n, test, draws, workers)
+    p = reference.probabilities(test)
+    p_values = np.full(len(n), np.nan)
+    for i in np.flatnonzero(n):
+        mads = simulate(n[i], test, draws)[2]
+        mad = np.abs(counts[i] / n[i] - p).mean()
+        # Simulated MADs are sorted, count those >= mad with a small tolerance for ties
+        exceed = len(mads) - np.searchsorted(mads, mad - 1e-12)
+        p_values[i] = (exceed + 1) / (len(mads) + 1)
+    return p_values
@@ -0,0 +1,176 @@
+import re
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from benford import cache, clarity, digits, pennsylvania, race_index, table
+
+# Every format is read into one long vote table, a row per (source, state, region, candidate,
+# vote type) with these columns encoded and a 'votes' column. Each region has a TOTAL row per
+# candidate, and where a source splits votes up, rows of each vote type adding up to it
+SCHEMA = ('source', 'state', 'region', 'candidate', 'vote_type')
+TOTAL = 'Votes'
+
+def candidate_key(name):
+    # One spelling of a candidate in every format, the capitalized last name: RCP's
+    # 'Trump', Clarity's 'Donald J. Trump (I) (Rep)' and Pennsylvania's 'TRUMP, DONALD J'
+    name = str(name)
+    if ',' in name:
+        return name.split(',')[0].strip().capitalize()
+    words = re.sub(r'\([^)]*\)', ' ', name).split()
+    return words[-1].capitalize() if words else name
+
+def region_key(name):
+    # Region names compared across sources: 'Appling County', 'APPLING' and 'Appling' are one region
+    name = re.sub(r'\s+county$', '', str(name).strip(), flags=re.IGNORECASE)
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+def relabel(codes, labels, key):
+    # Codes and labels of an encoded column after mapping its labels through key,
+    # labels with the same key share a code
+    keys = [key(l) for l in labels]
+    merged = list(dict.fromkeys(keys))
+    lookup = {k: i for i, k in enumerate(merged)}
+    return np.array([lookup[k] for k in keys], dtype=np.int64)[np.asarray(codes, dtype=np.int64)], merged
+
+def long_table(votes, **encoded):
+    # Schema table from a votes array and each SCHEMA column as (codes, labels), or one label for every row
+    votes = np.asarray(votes, dtype=np.int64)
+    t = {'columns': {}, 'labels': {}}
+    for name in SCHEMA:
+        value = encoded[name]
+        codes, labels = value if isinstance(value, tuple) else (np.zeros(len(votes), dtype=np.int64), [value])
+        t['columns'][name] = np.asarray(codes).astype(table.code_dtype(len(labels)))
+        t['labels'][name] = list(labels)
+    t['columns']['votes'] = table.compact(votes)
+    return t
+
+def from_race_index(tables, source='rcp'):
+    # County rows of counties_president.json, states are its region keys
+    t = tables['counties']
+    return long_table(
+        t['columns']['votes'],
+        source=source,
+        state=(t['columns']['region'], t['labels']['region']),
+        region=relabel(t['columns']['county'], t['labels']['county'], str),
+        candidate=relabel(t['columns']['candidate'], t['labels']['candidate'], candidate_key),
+        vote_type=TOTAL
+    )
+
+def from_clarity(tables, source='clarity', state='GA', contests=None):
+    # Vote type rows of a Clarity detail.xml, and their sum by region as the TOTAL rows.
+    # The schema has no contest, so the contests read can't share a candidate key
+    t = tables['detail']
+    keep = np.ones(table.num_rows(t), dtype=bool)
+    if contests is not None:
+        wanted = [i for i, c in enumerate(t['labels']['contest']) if c in contests]
+        keep = np.isin(t['columns']['contest'], wanted)
+    candidates, candidate_labels = relabel(t['columns']['choice'], t['labels']['choice'], candidate_key)
+    pairs = np.unique(np.stack([candidates[keep], np.asarray(t['columns']['contest'], dtype=np.int64)[keep]]), axis=1)
+    shared = np.unique(pairs[0][np.flatnonzero(pairs[0][1:] == pairs[0][:-1])])
+    if len(shared):
+        raise Exception('Choices of different contests share the candidate {}, read one of these contests at a time'.format(
+            ', '.join(candidate_labels[c] for c in shared)
+        ))
+    candidates, regions = candidates[keep], np.asarray(t['columns']['region'], dtype=np.int64)[keep]
+    votes = np.asarray(t['columns']['votes'], dtype=np.int64)[keep]
+    keys, inverse = np.unique(candidates * len(t['labels']['region']) + regions, return_inverse=True)
+    totals = np.bincount(inverse, weights=votes, minlength=len(keys)).astype(np.int64)
+    vote_types = np.asarray(t['columns']['vote_type'], dtype=np.int64)[keep] + 1
+    return long_table(
+        np.concatenate([votes, totals]),
+        source=source,
+        state=state,
+        region=(np.concatenate([regions, keys % len(t['labels']['region'])]), t['labels']['region']),
+        candidate=(np.concatenate([candidates, keys // len(t['labels']['region'])]), candidate_labels),
+        vote_type=(np.concatenate([vote_types, np.zeros(len(keys), dtype=np.int64)]), [TOTAL] + t['labels']['vote_type'])
+    )
+
+def from_pennsylvania(tables, source='pa', state='PA'):
+    # 'Votes' are the TOTAL rows, mail, provisional and the rest ('Not Mail Votes') add up to them
+    t = tables['votes']
+    columns = pennsylvania.table_columns(t)
+    vote_types = [TOTAL, 'Mail Votes', 'Provisional Votes', 'Not Mail Votes']
+    n = table.num_rows(t)
+    candidates, candidate_labels = relabel(t['columns']['Candidate Name'], t['labels']['Candidate Name'], candidate_key)
+    return long_table(
+        np.concatenate([columns[c] for c in vote_types]),
+        source=source,
+        state=state,
+        region=(np.tile(np.asarray(t['columns']['County Name'], dtype=np.int64), len(vote_types)), t['labels']['County Name']),
+        candidate=(np.tile(candidates, len(vote_types)), candidate_labels),
+        vote_type=(np.repeat(np.arange(len(vote_types)), n), vote_types)
+    )
+
+# Parser of each format and how its tables map to the schema
+FORMATS = {
+    'rcp': (race_index.read_tables, from_race_index),
+    'clarity': (clarity.read_tables, from_clarity),
+    'pennsylvania': (pennsylvania.read_tables, from_pennsylvania),
+}
+
+def source(format, path, name=None, **options):
+    # A source to load: its format, path, name in the source column (the format by default)
+    # and options of its from_ function such as state or contests
+    if format not in FORMATS:
+        raise Exception('Unknown source format ({})'.format(format))
+    return {'format': format, 'path': path, 'name': name or format, 'options': options}
+
+def read_source(s, use_cache=True):
+    read, convert = FORMATS[s['format']]
+    tables = cache.cached_tables(s['path'], read) if use_cache else read(s['path'])
+    return convert(tables, s['name'], **s['options'])
+
+def load(sources, workers=None, use_cache=True):
+    # Every source parsed (or read from .benford-cache/) in its own process, then concatenated into one table
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+    if workers <= 1:
+        return table.concat([read_source(s, use_cache) for s in sources])
+    with ProcessPoolExecutor(workers) as pool:
+        return table.concat(list(pool.map(read_source, sources, [use_cache] * len(sources))))
+
+def matching(t, **filters):
+    # Rows whose encoded columns have the given label, or one of a list of labels
+    keep = np.ones(table.num_rows(t), dtype=bool)
+    for name, value in filters.items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        wanted = [i for i, l in enumerate(t['labels'][name]) if l in values]
+        keep &= np.isin(t['columns'][name], wanted)
+    return keep
+
+def histograms(t, names, test, rows=None):
+    # Digit counts and totals of every combination of columns names among the given rows
+    keys, inverse = np.unique(table.combined_codes(t, names), return_inverse=True)
+    codes = inverse if rows is None else np.where(rows, inverse, -1)
+    counts, totals = digits.grouped_digit_histogram(codes, len(keys), t['columns']['votes'], test)
+    present = np.bincount(codes[codes >= 0], minlength=len(keys)) > 0
+    return (
+        [table.decode_codes(t, names, k) for k in keys[present]],
+        counts[present],
+        totals[present]
+    )
+
+def region_votes(t, rows):
+    # {region_key: votes} of the given rows
+    keys = np.array([region_key(r) for r in t['labels']['region']])
+    votes = {}
+    for key, v in zip(keys[t['columns']['region'][rows]], t['columns']['votes'][rows]):
+        votes[key] = votes.get(key, 0) + int(v)
+    return votes
+
+def compare_regions(t, a, b, **filters):
+    # Votes of two sources region by region, matched by region_key
+    votes_a = region_votes(t, matching(t, source=a, **filters))
+    votes_b = region_votes(t, matching(t, source=b, **filters))
+    both = sorted(votes_a.keys() & votes_b.keys())
+    diffs = np.array([votes_a[r] - votes_b[r] for r in both], dtype=np.int64)
+    return {
+        'matched': len(both),
+        'only_a': len(votes_a.keys() - votes_b.keys()),
+        'only_b': len(votes_b.keys() - votes_a.keys()),
+        'differ': int((diffs != 0).sum()),
+        'max_abs_diff': int(np.abs(diffs).max()) if len(diffs) else 0,
+        'votes_a': sum(votes_a[r] for r in both),
+        'votes_b': sum(votes_b[r] for r in both),
+    }
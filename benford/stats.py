@@ -0,0 +1,159 @@
+import math
+import numpy as np
+from benford import reference
+
+# Nigrini's MAD conformity upper bounds: close, acceptable, marginal, above is nonconformity
+MAD_RANGES = {
+    'first': (0.006, 0.012, 0.015),
+    'second': (0.008, 0.010, 0.012),
+    'first_two': (0.0012, 0.0018, 0.0022),
+    'first_three': (0.00036, 0.00044, 0.00050),
+}
+MAD_CLASSES = np.array(['Close conformity', 'Acceptable conformity', 'Marginal conformity', 'Nonconformity', 'n/a'])
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+# Beber & Scacco's last two digit pairs: repeated (11, 22, ...) and adjacent (12, 21, ...)
+_PAIRS = np.arange(100)
+REPEATED_PAIRS = _PAIRS // 10 == _PAIRS % 10
+ADJACENT_PAIRS = np.abs(_PAIRS // 10 - _PAIRS % 10) == 1
+
+def chi2_sf(x, df):
+    # Survival function of the chi-square distribution for integer degrees of freedom
+    x = np.asarray(x, dtype=np.float64)
+    half = x[..., None] / 2
+    with np.errstate(divide='ignore'):
+        log_half = np.log(half)
+    if df % 2 == 0:
+        # Poisson cdf: exp(-x/2) sum (x/2)^i / i!, i < df/2
+        i = np.arange(df // 2)
+        with np.errstate(invalid='ignore'):
+            log_terms = i * log_half - np.array([math.lgamma(k + 1) for k in i])
+        log_terms = np.where((i == 0) & (half == 0), 0, log_terms)
+        return np.exp(log_terms - half).sum(axis=-1)
+    # erfc(sqrt(x/2)) + exp(-x/2) sum (x/2)^(i-1/2) / gamma(i+1/2), 1 <= i <= (df-1)/2
+    i = np.arange(1, (df - 1) // 2 + 1)
+    log_terms = (i - 0.5) * log_half - np.array([math.lgamma(k + 0.5) for k in i])
+    tail = np.exp(log_terms - half).sum(axis=-1) if len(i) else 0
+    # frompyfunc returns a python float for 0-d input, an object array otherwise
+    return np.asarray(_erfc(np.sqrt(x / 2)), dtype=np.float64) + tail
+
+def conformity(counts, test):
+    # Statistics for every row of a (groups x digits) count matrix in one pass
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+    expected = reference.probabilities(test)
+    n = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = counts / n[:, None]
+        diff = observed - expected
+        chi2 = ((counts - n[:, None] * expected) ** 2 / (n[:, None] * expected)).sum(axis=1)
+        mad = np.abs(diff).mean(axis=1)
+        ks = np.abs(np.cumsum(diff, axis=1)).max(axis=1)
+        ks_critical = 1.36 / np.sqrt(n)
+        # Nigrini's Z-statistic, with continuity correction when it is smaller than the deviation
+        correction = 1 / (2 * n[:, None])
+        abs_diff = np.abs(diff)
+        z = (abs_diff - np.where(correction < abs_diff, correction, 0)) / np.sqrt(expected * (1 - expected) / n[:, None])
+
+    p_value = np.where(n > 0, chi2_sf(np.nan_to_num(chi2), len(expected) - 1), np.nan)
+    if test in MAD_RANGES:
+        mad_class = MAD_CLASSES[np.searchsorted(MAD_RANGES[test], mad)]
+        mad_class[n == 0] = MAD_CLASSES[-1]
+    else:
+        mad_class = np.full(len(n), MAD_CLASSES[-1])
+    return {
+        'n': n.astype(np.int64),
+        'chi2': chi2,
+        'p_value': p_value,
+        'mad': mad,
+        'mad_class': mad_class,
+        'ks': ks,
+        'ks_critical': ks_critical,
+        'z': z,
+    }
+
+def uniformity(counts):
+    # Chi-square test of every row of a count matrix against equal digit frequencies
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+    n = counts.sum(axis=1)
+    expected = n[:, None] / counts.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = ((counts - expected) ** 2 / expected).sum(axis=1)
+    p_value = np.where(n > 0, chi2_sf(np.nan_to_num(chi2), counts.shape[1] - 1), np.nan)
+    return n.astype(np.int64), chi2, p_value
+
+def _share(counts, pairs):
+    # Share of values in a set of pairs, with a two-sided normal p-value against its expected share
+    counts = np.asarray(counts, dtype=np.float64)
+    n = counts.sum(axis=1)
+    k = counts[:, pairs].sum(axis=1)
+    expected = pairs.mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (k - n * expected) / np.sqrt(n * expected * (1 - expected))
+    return k / np.where(n > 0, n, np.nan), np.where(n > 0, chi2_sf(np.nan_to_num(z) ** 2, 1), np.nan)
+
+def final_digits(last, plast, last_two):
+    # Uniformity of the last, second to last and last two digits, and Beber & Scacco's
+    # repeated and adjacent last two digit shares (expected 10% and 18%)
+    last_two = np.atleast_2d(last_two)
+    n_last, last_chi2, last_p = uniformity(last)
+    _, plast_chi2, plast_p = uniformity(plast)
+    n_pairs, pairs_chi2, pairs_p = uniformity(last_two)
+    repeated, repeated_p = _share(last_two, REPEATED_PAIRS)
+    adjacent, adjacent_p = _share(last_two, ADJACENT_PAIRS)
+    return {
+        'n': n_last,
+        'last_chi2': last_chi2,
+        'last_p': last_p,
+        'n_pairs': n_pairs,
+        'plast_chi2': plast_chi2,
+        'plast_p': plast_p,
+        'pairs_chi2': pairs_chi2,
+        'pairs_p': pairs_p,
+        'repeated': repeated,
+        'repeated_p': repeated_p,
+        'adjacent': adjacent,
+        'adjacent_p': adjacent_p,
+    }
+
+def final_digits_report(names, results):
+    # Text table with one line per group
+    names = [n if isinstance(n, str) else ' - '.join(map(str, n)) for n in names]
+    width = max([len('Group')] + [len(n) for n in names])
+    lines = ['{:<{}} {:>7} {:>8} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+        'Group', width, 'Size', 'Last p', 'Pairs', '2nd p', 'Pairs p', 'Repeat', 'p', 'Adjacent', 'p'
+    )]
+    for i, name in enumerate(names):
+        lines.append('{:<{}} {:>7,} {:>8.4f} {:>7,} {:>8.4f} {:>8.4f} {:>8.2%} {:>8.4f} {:>8.2%} {:>8.4f}'.format(
+            name,
+            width,
+            results['n'][i],
+            results['last_p'][i],
+            results['n_pairs'][i],
+            results['plast_p'][i],
+            results['pairs_p'][i],
+            results['repeated'][i],
+            results['repeated_p'][i],
+            results['adjacent'][i],
+            results['adjacent_p'][i]
+        ))
+    return '\n'.join(lines)
+
+def report(names, results):
+    # Text table with one line per group
+    names = [n if isinstance(n, str) else ' - '.join(map(str, n)) for n in names]
+    width = max([len('Group')] + [len(n) for n in names])
+    mc = 'mc_p_value' in results
+    lines = ['{:<{}} {:>7} {:>9} {:>8} {:>8} {:<22} {:>7}'.format('Group', width, 'Size', 'Chi2', 'p', 'MAD', 'MAD class', 'KS') + (' {:>8}'.format('MC p') if mc else '')]
+    for i, name in enumerate(names):
+        lines.append('{:<{}} {:>7,} {:>9.2f} {:>8.4f} {:>8.4f} {:<22} {:>7.4f}'.format(
+            name,
+            width,
+            results['n'][i],
+            results['chi2'][i],
+            results['p_value'][i],
+            results['mad'][i],
+            results['mad_class'][i],
+            results['ks'][i]
+        ) + (' {:>8.4f}'.format(results['mc_p_value'][i]) if mc else ''))
+    return '\n'.join(lines)
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Synthetic datasets shaped like counties_president.json, Clarity detail.xml and pennsylvania_county_votes.csv
+CANDIDATES = ['Biden', 'Trump', 'Jorgensen']
+CLARITY_CHOICES = ['Joseph R. Biden (Dem)', 'Donald J. Trump (I) (Rep)', 'Jo Jorgensen (Lib)']
+CLARITY_VOTE_TYPES = ['Election Day Votes', 'Absentee by Mail Votes', 'Advanced Voting Votes', 'Provisional Votes']
+PA_CANDIDATES = ['BIDEN, JOSEPH ROBINETTE', 'TRUMP, DONALD J', 'JORGENSEN, JO']
+N_STATES = 51
+CHUNK = 100000 # Regions written per chunk
+
+def votes(rng, n, tampered=False, tamper_rate=0.3):
+    # Log-uniform counts over 6 decades follow Benford's law for every leading digit
+    arr = np.floor(10 ** rng.uniform(0, 6, n)).astype(np.int64)
+    if tampered:
+        # Made up counts: leading digits roughly uniform, last digits never 0 or 5
+        fake = rng.random(n) < tamper_rate
+        made_up = rng.integers(10, 10000, fake.sum()) // 10 * 10
+        arr[fake] = made_up + rng.choice([1, 2, 3, 4, 6, 7, 8, 9], fake.sum())
+    return arr
+
+def _chunks(n):
+    for start in range(0, n, CHUNK):
+        yield start, min(start + CHUNK, n)
+
+def write_counties_json(path, n, rng, tampered=False):
+    # About n county vote counts, len(CANDIDATES) per county spread over N_STATES states
+    n_counties = max(1, n // len(CANDIDATES))
+    states = ['S{:02d}'.format(i) for i in range(N_STATES)]
+    with open(path, 'w') as f:
+        f.write('{"map_county_data": {"election": {"race": [')
+        for start, stop in _chunks(n_counties):
+            v = votes(rng, (stop - start) * len(CANDIDATES), tampered).reshape(-1, len(CANDIDATES))
+            f.write(','.join(
+                '{{"region_key": "{}", "county_name": "C{}", "candidates": [{}]}}'.format(
+                    states[i % N_STATES], i,
+                    ', '.join('{{"last_name": "{}", "votes": {}}}'.format(c, x) for c, x in zip(CANDIDATES, row))
+                )
+                for i, row in zip(range(start, stop), v.tolist())
+            ))
+            if stop < n_counties:
+                f.write(',')
+        f.write(']}}, "top_level_ru": [')
+        v = votes(rng, N_STATES * len(CANDIDATES), tampered).reshape(-1, len(CANDIDATES)) * 100
+        f.write(','.join(
+            '{{"region_key": "{}", "candidates": [{}]}}'.format(
+                s, ', '.join('{{"last_name": "{}", "votes": {}}}'.format(c, x) for c, x in zip(CANDIDATES, row))
+            )
+            for s, row in zip(states, v.tolist())
+        ))
+        f.write(']}')
+
+def write_clarity_xml(path, n, rng, tampered=False, region_tag='County'):
+    # About n county (or precinct) vote counts of one presidential Contest, by Choice and VoteType
+    n_counties = max(1, n // (len(CLARITY_CHOICES) * len(CLARITY_VOTE_TYPES)))
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<ElectionResult><Timestamp>synthetic</Timestamp>')
+        f.write('<Contest key="1" text="President of the United States">')
+        for key, choice in enumerate(CLARITY_CHOICES):
+            v = votes(rng, n_counties * len(CLARITY_VOTE_TYPES), tampered).reshape(len(CLARITY_VOTE_TYPES), -1)
+            f.write('<Choice key="{}" text="{}" totalVotes="{}">'.format(key, choice, int(v.sum())))
+            for vote_type, vt_votes in zip(CLARITY_VOTE_TYPES, v):
+                f.write('<VoteType name="{}" votes="{}">'.format(vote_type, int(vt_votes.sum())))
+                for start, stop in _chunks(n_counties):
+                    f.write(''.join(
+                        '<{} name="C{}" votes="{}" />'.format(region_tag, i, x)
+                        for i, x in zip(range(start, stop), vt_votes[start:stop].tolist())
+                    ))
+                f.write('</VoteType>')
+            f.write('</Choice>')
+        f.write('</Contest></ElectionResult>')
+
+def write_pa_csv(path, n, rng, tampered=False):
+    # About n rows, one per (county, candidate), with comma separated thousands like the real export
+    n_counties = max(1, n // len(PA_CANDIDATES))
+    with open(path, 'w') as f:
+        f.write('Election Name,County Name,Office Name,Party Name,Candidate Name,Votes,Election Day Votes,Mail Votes,Provisional Votes\n')
+        for start, stop in _chunks(n_counties):
+            rows = (stop - start) * len(PA_CANDIDATES)
+            # Totals follow the distribution, and are split at random into vote types
+            total = votes(rng, rows, tampered)
+            provisional = np.minimum(rng.integers(0, 3000, rows), total // 10)
+            mail = ((total - provisional) * rng.random(rows)).astype(np.int64)
+            election_day = total - provisional - mail
+            f.write(''.join(
+                '2020,C{},President,X,"{}","{:,}","{:,}","{:,}","{:,}"\n'.format(
+                    start + i // len(PA_CANDIDATES), PA_CANDIDATES[i % len(PA_CANDIDATES)], t, e, m, p
+                )
+                for i, (t, e, m, p) in enumerate(zip(total.tolist(), election_day.tolist(), mail.tolist(), provisional.tolist()))
+            ))
+
+WRITERS = {
+    'nationwide': (write_counties_json, 'counties_president.json'),
+    'georgia': (write_clarity_xml, 'detail.xml'),
+    'pennsylvania': (write_pa_csv, 'pennsylvania_county_votes.csv'),
+}
@@ -0,0 +1,116 @@
+import array
+import numpy as np
+
+# A table is {'columns': {name: array}, 'labels': {name: [label]}}, columns with
+# labels are dictionary encoded: each value is an index into its labels list.
+# Codes use the smallest unsigned type for their number of labels and counts
+# are uint32, so a row takes a few bytes per column
+
+def code_dtype(n):
+    # Smallest unsigned type that can index n labels
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+def compact(arr):
+    # Counts as uint32 when they fit, otherwise unchanged
+    arr = np.asarray(arr)
+    if arr.dtype.kind not in 'iu' or arr.dtype.itemsize <= 4:
+        return arr
+    if len(arr) and (arr.min() < 0 or arr.max() > np.iinfo(np.uint32).max):
+        return arr
+    return arr.astype(np.uint32)
+
+def encode(values):
+    # Codes in first seen order
+    lookup = {}
+    codes = np.fromiter(
+        (lookup.setdefault(v, len(lookup)) for v in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+    return codes.astype(code_dtype(len(lookup))), list(lookup)
+
+def table(columns, encoded={}):
+    t = {'columns': {name: compact(arr) for name, arr in columns.items()}, 'labels': {}}
+    for name, values in encoded.items():
+        t['columns'][name], t['labels'][name] = encode(values)
+    return t
+
+def builder(encoded, columns):
+    # Table filled one row at a time, names are coded as they arrive so no
+    # per row strings are kept while reading
+    return {
+        'lookups': {name: {} for name in encoded},
+        'codes': {name: array.array('I') for name in encoded},
+        'columns': {name: array.array('q') for name in columns},
+    }
+
+def append(b, labels, values):
+    # labels and values in the order of builder()'s encoded and columns
+    for (name, lookup), label in zip(b['lookups'].items(), labels):
+        b['codes'][name].append(lookup.setdefault(label, len(lookup)))
+    for arr, value in zip(b['columns'].values(), values):
+        arr.append(value)
+
+def build(b):
+    t = {'columns': {}, 'labels': {}}
+    for name, arr in b['columns'].items():
+        t['columns'][name] = compact(np.frombuffer(arr, dtype=np.int64))
+    for name, lookup in b['lookups'].items():
+        codes = np.frombuffer(b['codes'][name], dtype=np.uint32)
+        t['columns'][name], t['labels'][name] = codes.astype(code_dtype(len(lookup))), list(lookup)
+    return t
+
+def nbytes(t):
+    # Memory of a table's arrays, labels are not counted
+    return sum(arr.nbytes for arr in t['columns'].values())
+
+def num_rows(t):
+    return len(next(iter(t['columns'].values()))) if t['columns'] else 0
+
+def group_rows(keys):
+    # (key, row indices) for every distinct key, in order of first appearance
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return []
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    groups = np.split(order, bounds)
+    groups.sort(key=lambda rows: rows[0])
+    return [(keys[rows[0]], rows) for rows in groups]
+
+def combined_codes(t, names):
+    # Single int64 code for a combination of encoded columns
+    code = np.zeros(num_rows(t), dtype=np.int64)
+    for name in names:
+        code = code * len(t['labels'][name]) + t['columns'][name]
+    return code
+
+def decode_codes(t, names, code):
+    # Labels of a combined_codes() value
+    labels = []
+    for name in reversed(names):
+        code, c = divmod(int(code), len(t['labels'][name]))
+        labels.append(t['labels'][name][c])
+    return tuple(reversed(labels))
+
+def concat(tables):
+    # Rows of tables with the same columns one after another, labels of encoded columns merged
+    t = {'columns': {}, 'labels': {}}
+    for name in tables[0]['columns']:
+        arrs = [x['columns'][name] for x in tables]
+        if name not in tables[0]['labels']:
+            t['columns'][name] = compact(np.concatenate([np.asarray(a, dtype=np.int64) for a in arrs]))
+            continue
+        labels = list(dict.fromkeys(l for x in tables for l in x['labels'][name]))
+        lookup = {l: i for i, l in enumerate(labels)}
+        codes = [
+            np.array([lookup[l] for l in x['labels'][name]], dtype=np.int64)[np.asarray(a, dtype=np.int64)]
+            for x, a in zip(tables, arrs)
+        ]
+        t['columns'][name] = np.concatenate(codes).astype(code_dtype(len(labels)))
+        t['labels'][name] = labels
+    return t
@@ -0,0 +1,73 @@
+import os
+import sys
+import argparse
+from benford import instrument, sources, stats
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Clarity contests read by default, every other source only has presidential votes
+CONTESTS = ['President of the United States']
+# Format and default path of each source
+SOURCES = {
+    'rcp': ('rcp', os.path.join(ROOT, 'counties_president.json')),
+    'clarity': ('clarity', os.path.join(ROOT, 'Georgia-Election', 'detail.xml')),
+    'pa': ('pennsylvania', os.path.join(ROOT, 'Pennsylvania-Election', 'pennsylvania_county_votes.csv')),
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load every source into one vote table at once, and compare their digit tests and region counts')
+    for name, (_, path) in SOURCES.items():
+        parser.add_argument('--{}'.format(name), default=path, help='Path of the {} source'.format(name))
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--contests', nargs='+', default=CONTESTS, help='Clarity contests read, their candidates must not share a last name')
+    parser.add_argument('--states', nargs='+', help='Only compare these states (default: every state)')
+    parser.add_argument('--candidates', nargs='+', help='Only compare these candidates, by last name')
+    parser.add_argument('--vote-type', default=sources.TOTAL, help='Vote type compared (default: every vote)')
+    parser.add_argument('--test', default='first', choices=['first', 'second', 'first_two', 'last', 'plast', 'last_two'])
+    parser.add_argument('--workers', type=int, help='Processes loading sources (default: all cores)')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every source instead of reading .benford-cache/')
+    parser.add_argument('--report', help='Write stage timings, counters and peak memory of the run as json to this path')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.report:
+        instrument.enable()
+
+    with instrument.stage('ingest'):
+        t = sources.load(
+            [
+                sources.source(SOURCES[name][0], getattr(args, name), name, **({'contests': args.contests} if name == 'clarity' else {}))
+                for name in args.sources
+            ],
+            args.workers,
+            not args.no_cache
+        )
+    instrument.count('records_ingested', len(t['columns']['votes']))
+
+    with instrument.stage('stats'):
+        # Digit test of every source, state and candidate
+        rows = sources.matching(t, state=args.states, candidate=args.candidates, vote_type=args.vote_type)
+        names, counts, _ = sources.histograms(t, ['source', 'state', 'candidate'], args.test, rows)
+        print(stats.report(names, stats.conformity(counts, args.test)))
+
+        # Region counts of every pair of sources sharing a state and candidate
+        print('{:<10}{:<10}{:<7}{:<12}{:>8}{:>8}{:>8}{:>8}{:>14}{:>14}'.format(
+            'Source', 'Against', 'State', 'Candidate', 'Matched', 'Only A', 'Only B', 'Differ', 'Votes A', 'Votes B'
+        ))
+        groups = {}
+        for source, state, candidate in names:
+            groups.setdefault((state, candidate), []).append(source)
+        for (state, candidate), found in groups.items():
+            for i, a in enumerate(found):
+                for b in found[i + 1:]:
+                    c = sources.compare_regions(t, a, b, state=state, candidate=candidate, vote_type=args.vote_type)
+                    print('{:<10}{:<10}{:<7}{:<12}{:>8}{:>8}{:>8}{:>8}{:>14,}{:>14,}'.format(
+                        a, b, state, candidate, c['matched'], c['only_a'], c['only_b'], c['differ'], c['votes_a'], c['votes_b']
+                    ))
+
+    if args.report:
+        instrument.finish(args.report)
+
+if __name__=='__main__':
+    main(sys.argv[1:])
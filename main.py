@@ -1,17 +1,30 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import json
 import math
-from textwrap import wrap
+import time
+import numpy as np
+from benford import cache, digits, histogram, instrument, live, race_index, reference, render, simulate, stats
 
 SHOW_PLOTS = True # Show interactive plots
+USE_CACHE = True # Reuse parsed counties_president.json from .benford-cache/ until it changes
 SAVE_FIGS = False # Save jpg of plots
+RENDER_WORKERS = None # Processes used to save jpgs (None for all cores)
+FAST_RENDER = True # Reuse one headless figure per plot layout when saving jpgs
+RENDER_CACHE = True # Only redo jpgs whose plot changed since they were saved (spec hashes in .render-manifest.json)
 NATIONWIDE_COUNTS_PLOTS = True # Plots of nationwide counts by county
 STATE_COUNTY_COUNTS_PLOTS = True # Plots of counts at STATES_TO_RUN states by county
 STATE_COUNTS_PLOTS = False # Plots of counts at the 50 states
+GRID_PLOTS = None # Plot STATE_COUNTY_COUNTS_PLOTS as one grid of state panels per candidate and comparison: 'jpg', or 'pdf' for pages of panels
+PRINT_STATS = True # Print conformity statistics (chi-square, MAD, KS) of every state and candidate by county
+COMPUTE_ONLY = False # Only count and print statistics, no plots, so pandas and matplotlib are never imported
+CONFIDENCE_BANDS = True # Draw 95% Monte Carlo bands for each plot's sample size, and print Monte Carlo p-values
+SIMULATION_DRAWS = 10000 # Simulated samples per sample size
+SIMULATION_WORKERS = None # Processes used for simulations (None for all cores)
 CANDIDATES_TO_RUN = [('Biden', ['b', 'c']), ('Trump', ['r', 'orange']), ('Jorgensen', ['g', 'c'])] # (Which candidate to count, color)
-FIRST_DIGIT_TEST = False # 1st or 2nd digit to do Benford's test on
-FINAL_DIGITS_TEST = False # Test last 2 digits
+FIRST_DIGIT_TEST = False # 1st or 2nd digit to do Benford's test on (run.py runs both)
+FINAL_DIGITS_TEST = False # Test last 2 digits: plots, and uniformity and repeated/adjacent pair stats
+RUN_REPORT = None # Write stage timings, counters and peak memory of the run as json to this path
+PROFILE_STAGE = None # cProfile one stage ('ingest', 'count', 'stats', 'plot' or 'render') and print its hot spots
+WATCH_FEED = None # Poll this counties_president.json file or url, and replot and print stats of only the changed states
+WATCH_INTERVAL = 60 # Seconds between polls of WATCH_FEED
 STATES_TO_RUN = [ # Which states to count
     "AK",
     "AL",
@@ -66,244 +79,311 @@ STATES_TO_RUN = [ # Which states to count
     "WY"
 ]
 
-# Benford's law 1st digit test
-if FIRST_DIGIT_TEST:
-    S_BENFORDS = pd.Series(
-        [0.301, 0.176, 0.125, 0.097, 0.079, 0.067, 0.058, 0.051, 0.046],
-        index=range(1,10)
-    )
-# 2nd digit test
-else:
-    S_BENFORDS = pd.Series(
-        [0.12, 0.114, 0.109, 0.104, 0.1, 0.097, 0.093, 0.09, 0.088, 0.085],
-        index=range(0,10)
-    )
-
-def get_digit(num):
-    return int(str(num)[0 if FIRST_DIGIT_TEST else 1])
+def set_digit_test(first_digit_test):
+    # Digit test of all counts and plots below
+    global FIRST_DIGIT_TEST, DIGIT_TEST, BENFORDS, BENFORDS_INDEX
+    FIRST_DIGIT_TEST = first_digit_test
+    DIGIT_TEST = 'first' if first_digit_test else 'second'
+    # Benford's law expected proportions for the digit test
+    BENFORDS = reference.probabilities(DIGIT_TEST)
+    BENFORDS_INDEX = reference.index(DIGIT_TEST)
 
-def get_last_digit(num):
-    return int(str(num)[-1])
-def get_plast_digit(num):
-    return int(str(num)[-2])
+set_digit_test(FIRST_DIGIT_TEST)
 
-def set_bl_labels(p):
-    p.set_xlabel('{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'))
-    p.set_ylabel('Proportion')
-    p.legend(['Benford\'s law', 'Actual value'])
+def bl_labels(band=False):
+    return {
+        'xlabel': '{} Digit Value'.format('Leading' if FIRST_DIGIT_TEST else 'Second'),
+        'ylabel': 'Proportion',
+        'legend': ['Benford\'s law', '95% band', 'Actual value'] if band else ['Benford\'s law', 'Actual value']
+    }
 
-def save_plot_jpg(name):
-    n = '{}-Digit-BL-Test/{}'.format(
+def plot_path(name):
+    return '{}-Digit-BL-Test/{}'.format(
         '1st' if FIRST_DIGIT_TEST else '2nd', name
     )
-    plt.savefig(n)
-    print('Saved "{}"'.format(n))
-    plt.close()
 
-def plot_benfords_law(data, vote_totals, title, colors, save_dir):
+def state_grid(directory, title, sharey=True):
+    # One grid with a panel per state in place of every state's own jpg
+    return render.grid_spec(title, path='{}/Grids/{}.{}'.format(directory, title, GRID_PLOTS), sharey=sharey)
+
+def plot_benfords_law(data, vote_totals, title, colors, save_dir, grid=None):
     # Convert to percentages
     data_totals = sum(data)
-    data = pd.Series(map(lambda x: x / data_totals, data), index=range(1,10) if FIRST_DIGIT_TEST else range(0,10))
+    data = np.asarray(data) / data_totals
     # Plot with Benford's law
-    plt.figure()
-    p = data.plot.bar(color=colors, rot=45)
-    p.plot(range(len(S_BENFORDS)), S_BENFORDS, '.-', color='y', markerfacecolor='w', markeredgecolor='gray')
-    title = '{} Vote Count - {:,}, Size - {:,}'.format(title, vote_totals , data_totals)
-    p.set_title('\n'.join(wrap(title, 60)))
-    set_bl_labels(p)
-
-    if SAVE_FIGS:
-        if save_dir:
-            name = 'State-Counts-by-county-jpgs/'+title+'.jpg'
-        else:
-            name = 'Nationwide-Counts-by-county-jpgs/'+title+'.jpg'
-        save_plot_jpg(name)
+    title = '{} Vote Count - {:,}, Size - {:,}'.format(save_dir if grid else title, vote_totals , data_totals)
+    if save_dir:
+        name = 'State-Counts-by-county-jpgs/'+title+'.jpg'
+    else:
+        name = 'Nationwide-Counts-by-county-jpgs/'+title+'.jpg'
+    render.plot(render.plot_spec(
+        title,
+        {'Actual value': data},
+        BENFORDS_INDEX,
+        [colors],
+        path=plot_path(name),
+        reference=BENFORDS,
+        band=simulate.bands(data_totals, DIGIT_TEST, SIMULATION_DRAWS) if CONFIDENCE_BANDS else None,
+        rot=45,
+        **bl_labels(CONFIDENCE_BANDS)
+    ), SAVE_FIGS, grid)
 
     return data
 
-def find_key(l, k):
-    if type(k) == tuple:
-        # Find matching key in a list by iterating
-        if type(l) == list:
-            for v in l:
-                if v[k[0]] == k[1]:
-                    # print(v)
-                    return v
-            raise Exception('Key not found in list ({})'.format(k[0]))
-        # Find matching key in a dict by comparison
-        elif type(l) == dict:
-            if k[0] not in l:
-                raise Exception('Key not found in dict ({})'.format(k[0]))
-            if l[k[0]] != k[1]:
-                return False
-            return l
-        else:
-            raise Exception('Unexpected type ({})'.format(type(l)))
-    else:
-        return l[k]
-
-def count_leading_numbers_and_plot(data, keys, title, colors=['b'], state=None):
-    leading_nums = [0 for _ in range(9 if FIRST_DIGIT_TEST else 10)]
-    last_digit_totals = [0 for _ in range(10)]
-    plast_digit_totals = [0 for _ in range(10)]
-    totals = 0
-    for val in data:
-        # Get current key value
-        curr_val = find_key(val, keys[0])
-        if curr_val == False:
-            continue
-        if len(keys) > 1:
-            for i in range(1, len(keys)):
-                curr_val = find_key(curr_val, keys[i])
-
-        # Count leading digit and total vote count
-        if (FIRST_DIGIT_TEST and int(curr_val) != 0) or (not FIRST_DIGIT_TEST and int(curr_val) >= 10):
-            digit = get_digit(curr_val)
-            if FIRST_DIGIT_TEST:
-                digit -= 1 # Shift 1 for 1st digit test (no 0 value)
-            leading_nums[digit] += 1
-            totals += int(curr_val)
-
-        # Final digits count
-        if FINAL_DIGITS_TEST and int(curr_val) != 0:
-            last_digit_totals[get_last_digit(curr_val)] += 1
-            if int(curr_val) >= 10:
-                plast_digit_totals[get_plast_digit(curr_val)] += 1
+def count_leading_numbers_and_plot(votes, title, colors=['b'], state=None, grid=None):
+    # Count leading digit, final digits and total vote count
+    h = histogram.histogram(votes, (DIGIT_TEST, 'last', 'plast') if FINAL_DIGITS_TEST else (DIGIT_TEST,))
+    leading_nums, totals = h['counts'][DIGIT_TEST], h['totals'][DIGIT_TEST]
 
     if FINAL_DIGITS_TEST:
-        print(last_digit_totals)
-        print(plast_digit_totals)
-        df = pd.DataFrame({
-            'Last Digit': last_digit_totals,
-            'Second Last Digit': plast_digit_totals
-        })
-        p = df.plot.bar(color=colors, edgecolor='k')
-        mean_l_d = df['Last Digit'].mean()
-        mean_pl_d = df['Second Last Digit'].mean()
-        p.hlines(mean_l_d, -1, 10, linestyles='dashed', color='k')
-        p.hlines(mean_pl_d, -1, 10, linestyles='dashed', color='gray')
-        p.legend(['Mean Last Digit', 'Mean 2nd Last Digit', 'Last Digit', 'Second Last Digit'])
+        last_digit_totals = h['counts']['last']
+        plast_digit_totals = h['counts']['plast']
+        print(last_digit_totals.tolist())
+        print(plast_digit_totals.tolist())
         f_title = title+'2 Final Digits'
-        p.set_title('\n'.join(wrap(f_title, 60)))
-        p.set_xlabel('Number')
-        p.set_ylabel('Frequency')
+        if state:
+            name = 'Final-Digits-Test/State-Counts-by-county-jpgs/'+f_title+'.jpg'
+        else:
+            name = 'Final-Digits-Test/Nationwide-Counts-by-county-jpgs/'+f_title+'.jpg'
+        if grid:
+            render.plot(
+                render.final_digits_spec(state, last_digit_totals, plast_digit_totals, colors),
+                SAVE_FIGS,
+                state_grid('Final-Digits-Test/State-Counts-by-county-jpgs', grid + ' 2 Final Digits', sharey=False)
+            )
+        else:
+            render.plot(render.final_digits_spec(f_title, last_digit_totals, plast_digit_totals, colors, name), SAVE_FIGS)
+
+    grid = state_grid(plot_path('State-Counts-by-county-jpgs'), grid) if grid else None
+    return h, plot_benfords_law(leading_nums, totals, title, colors[0], state, grid)
 
-        if SAVE_FIGS:
-            if state:
-                name = 'Final-Digits-Test/State-Counts-by-county-jpgs/'+f_title+'.jpg'
+def watch():
+    colors = dict(CANDIDATES_TO_RUN)
+    state = None
+    while True:
+        try:
+            race = live.fetch(WATCH_FEED)['map_county_data']['election']['race']
+            if state is None:
+                state = live.start(race, DIGIT_TEST)
+                changed = set(state['counts'])
             else:
-                name = 'Final-Digits-Test/Nationwide-Counts-by-county-jpgs/'+f_title+'.jpg'
-            plt.savefig(name)
-            print('Saved "{}"'.format(name))
-            plt.close()
+                # Only counties with new votes are recounted
+                changed = live.update(state, race)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # An unreachable feed, a half written file or a payload of another shape, retried next poll.
+            # The kept histograms are untouched, update reads the whole snapshot before changing them
+            print('{} Could not read {} ({}: {})'.format(time.strftime('%H:%M:%S'), WATCH_FEED, type(e).__name__, e))
+            time.sleep(WATCH_INTERVAL)
+            continue
+        changed = sorted(g for g in changed if g[0] in STATES_TO_RUN and g[1] in colors)
+        print('{} {} (state, candidate) groups changed'.format(time.strftime('%H:%M:%S'), len(changed)))
 
-    return totals, sum(leading_nums), plot_benfords_law(leading_nums, totals, title, colors[0], state)
+        if changed and PRINT_STATS:
+            counts = np.array([state['counts'][g] for g in changed])
+            results = stats.conformity(counts, DIGIT_TEST)
+            if CONFIDENCE_BANDS:
+                results['mc_p_value'] = simulate.empirical_p_values(counts, DIGIT_TEST, SIMULATION_DRAWS, SIMULATION_WORKERS)
+            print(stats.report(changed, results))
 
-def main():
-    with open('counties_president.json') as f:
-        election_data = json.load(f)
-
-    county_data = election_data['map_county_data']['election']['race']
-    state_data = election_data['top_level_ru']
-
-    # Count leading numbers
-    if NATIONWIDE_COUNTS_PLOTS:
-        nationwide_leading_numbers = {x : None for x, _ in CANDIDATES_TO_RUN}
-        nationwide_totals = 0
-        nationwide_leading_nums_totals = 0
-    if STATE_COUNTY_COUNTS_PLOTS:
-        state_county_leading_numbers = {x : {y : None for y, _ in CANDIDATES_TO_RUN} for x in STATES_TO_RUN}
-        state_county_totals = {x : 0 for x in STATES_TO_RUN}
-        state_county_leading_nums_totals = {x : 0 for x in STATES_TO_RUN}
-
-    # Count and plot individual candidate leading numbers
-    for candidate, color in CANDIDATES_TO_RUN:
-
-        # Count all counties in the US
-        if NATIONWIDE_COUNTS_PLOTS:
-            nationwide_totals, nationwide_leading_nums_totals, nationwide_leading_numbers[candidate] = count_leading_numbers_and_plot(
-                county_data,
-                ['candidates', ('last_name', candidate), 'votes'],
-                '{} 2020 Election {} by County, '.format('All Votes', candidate),
-                colors=color
-            )
+        # Interactive plots would pile up every poll, so only jpgs are replotted
+        if changed and SAVE_FIGS and not COMPUTE_ONLY:
+            if STATE_COUNTY_COUNTS_PLOTS:
+                for region, candidate in changed:
+                    if state['counts'][(region, candidate)].sum():
+                        plot_benfords_law(
+                            state['counts'][(region, candidate)],
+                            state['totals'][(region, candidate)],
+                            '{} 2020 Election {} by County, '.format(region, candidate),
+                            colors[candidate][0],
+                            region
+                        )
+            if NATIONWIDE_COUNTS_PLOTS:
+                for candidate in sorted({c for _, c in changed}):
+                    counts, total = live.candidate_counts(state, candidate)
+                    plot_benfords_law(
+                        counts,
+                        total,
+                        '{} 2020 Election {} by County, '.format('All Votes', candidate),
+                        colors[candidate][0],
+                        None
+                    )
+            render.flush(RENDER_WORKERS, FAST_RENDER, RENDER_CACHE)
+
+        time.sleep(WATCH_INTERVAL)
+
+def load():
+    if USE_CACHE:
+        tables = cache.cached_tables('counties_president.json', race_index.read_tables)
+    else:
+        tables = race_index.read_tables('counties_president.json')
+
+    instrument.count('records_ingested', len(tables['counties']['columns']['votes']) + len(tables['states']['columns']['votes']))
+    digits.count_skipped(tables['counties']['columns']['votes'])
+    digits.count_skipped(tables['states']['columns']['votes'])
+    # Group votes by (state, candidate) once, all counts are read from these
+    return tables, race_index.index_table(tables['counties']), race_index.index_table(tables['states'])
+
+def run(data):
+    # Count, print and plot the loaded data with the current digit test
+    tables, county_index, state_index = data
 
-        # Count in certain states
+    with instrument.stage('stats'):
+        if PRINT_STATS or CONFIDENCE_BANDS:
+            names, counts, _ = digits.table_histograms(tables['counties'], ['region', 'candidate'], DIGIT_TEST)
+        if CONFIDENCE_BANDS:
+            # Simulate every state and nationwide sample size up front, across processes
+            sizes = counts.sum(axis=1)
+            nationwide_sizes = {}
+            for (_, candidate), size in zip(names, sizes):
+                nationwide_sizes[candidate] = nationwide_sizes.get(candidate, 0) + size
+            simulate.simulate_many(list(sizes) + list(nationwide_sizes.values()), DIGIT_TEST, SIMULATION_DRAWS, SIMULATION_WORKERS)
+        if PRINT_STATS:
+            results = stats.conformity(counts, DIGIT_TEST)
+            if CONFIDENCE_BANDS:
+                results['mc_p_value'] = simulate.empirical_p_values(counts, DIGIT_TEST, SIMULATION_DRAWS)
+            print(stats.report(names, results))
+        if PRINT_STATS and FINAL_DIGITS_TEST:
+            names, last, plast, last_two = digits.table_final_digits(tables['counties'], ['region', 'candidate'])
+            print(stats.final_digits_report(names, stats.final_digits(last, plast, last_two)))
+
+    # Counts below are only for plots
+    if COMPUTE_ONLY:
+        return
+
+    with instrument.stage('count'):
+        # Count leading numbers
+        if NATIONWIDE_COUNTS_PLOTS:
+            nationwide_leading_numbers = {x : None for x, _ in CANDIDATES_TO_RUN}
+            nationwide_totals = 0
+            nationwide_leading_nums_totals = 0
         if STATE_COUNTY_COUNTS_PLOTS:
-            for state in STATES_TO_RUN:
-                tot, ln_tot, state_county_leading_numbers[state][candidate] = count_leading_numbers_and_plot(
-                    county_data,
-                    [('region_key', state), 'candidates', ('last_name', candidate), 'votes'],
-                    '{} 2020 Election {} by County, '.format(state, candidate),
-                    colors=color,
-                    state=state
+            state_county_leading_numbers = {x : {y : None for y, _ in CANDIDATES_TO_RUN} for x in STATES_TO_RUN}
+            state_county_hists = {x : histogram.empty((DIGIT_TEST,)) for x in STATES_TO_RUN}
+
+        # Count and plot individual candidate leading numbers
+        for candidate, color in CANDIDATES_TO_RUN:
+
+            # Count all counties in the US
+            if NATIONWIDE_COUNTS_PLOTS:
+                h, nationwide_leading_numbers[candidate] = count_leading_numbers_and_plot(
+                    race_index.lookup(county_index, candidate),
+                    '{} 2020 Election {} by County, '.format('All Votes', candidate),
+                    colors=color
                 )
-                state_county_totals[state] += tot
-                state_county_leading_nums_totals[state] += ln_tot
-
-        # Count state level
-        if STATE_COUNTS_PLOTS:
-            count_leading_numbers_and_plot(
-                state_data,
-                ['candidates', ('last_name', candidate), 'votes'],
-                '2020 Election {} by State, '.format(candidate),
-                colors=color
-            )
+                nationwide_totals, nationwide_leading_nums_totals = h['totals'][DIGIT_TEST], int(h['counts'][DIGIT_TEST].sum())
 
-    def plot_combined_counts(df, biden_v_trump):
-        return pd.DataFrame(df).plot.bar(
-            color=['b', 'r', 'gray'] if biden_v_trump else ['b', 'r', 'g', 'gray'],
-            rot=45
-        )
-
-    # Plot canididates datas on same figure
-    if NATIONWIDE_COUNTS_PLOTS:
-        nationwide_leading_numbers['Benford\'s Law'] = S_BENFORDS
-        # Plot all 3, and biden v trump
-        for caption, biden_v_trump in [('All Candidates', False), ('Biden v. Trump', True)]:
-            # If biden_v_trump, reduce to only those 2 candidates
-            if biden_v_trump:
-                # If already biden_v_trump, skip
-                if len(nationwide_leading_numbers) == 3:
-                    continue
-                nationwide_leading_numbers = {x : nationwide_leading_numbers[x] for x in ['Biden', 'Trump', 'Benford\'s Law']}
-            p = plot_combined_counts(nationwide_leading_numbers, biden_v_trump)
-            title = 'All votes 2020 Election {} by County, Vote Count - {:,}, Size - {:,}'.format(
-                caption,
-                nationwide_totals,
-                nationwide_leading_nums_totals
-            )
-            p.set_title('\n'.join(wrap(title, 60)))
-            set_bl_labels(p)
-            if SAVE_FIGS:
-                name = 'Nationwide-Counts-by-county-jpgs/Combined '+title+'.jpg'
-                save_plot_jpg(name)
-
-    if STATE_COUNTY_COUNTS_PLOTS:
-        for state in STATES_TO_RUN:
+            # Count in certain states
+            if STATE_COUNTY_COUNTS_PLOTS:
+                for state in STATES_TO_RUN:
+                    h, state_county_leading_numbers[state][candidate] = count_leading_numbers_and_plot(
+                        race_index.lookup(county_index, candidate, [state]),
+                        '{} 2020 Election {} by County, '.format(state, candidate),
+                        colors=color,
+                        state=state,
+                        grid='All States 2020 Election {} by County'.format(candidate) if GRID_PLOTS else None
+                    )
+                    # Final digit counts aren't plotted per state, so only the digit test is merged
+                    state_county_hists[state] = histogram.merge(state_county_hists[state], histogram.select(h, (DIGIT_TEST,)))
+
+            # Count state level
+            if STATE_COUNTS_PLOTS:
+                count_leading_numbers_and_plot(
+                    race_index.lookup(state_index, candidate),
+                    '2020 Election {} by State, '.format(candidate),
+                    colors=color
+                )
+
+    def plot_combined_counts(df, biden_v_trump, title, name, grid=None):
+        render.plot(render.plot_spec(
+            title,
+            df,
+            BENFORDS_INDEX,
+            ['b', 'r', 'gray'] if biden_v_trump else ['b', 'r', 'g', 'gray'],
+            path=plot_path(name),
+            rot=45,
+            **bl_labels()
+        ), SAVE_FIGS, grid)
+
+    with instrument.stage('plot'):
+        # Plot canididates datas on same figure
+        if NATIONWIDE_COUNTS_PLOTS:
+            nationwide_leading_numbers['Benford\'s Law'] = BENFORDS
             # Plot all 3, and biden v trump
             for caption, biden_v_trump in [('All Candidates', False), ('Biden v. Trump', True)]:
                 # If biden_v_trump, reduce to only those 2 candidates
                 if biden_v_trump:
                     # If already biden_v_trump, skip
-                    if len(state_county_leading_numbers[state]) == 3:
+                    if len(nationwide_leading_numbers) == 3:
                         continue
-                    state_county_leading_numbers[state] = {x : state_county_leading_numbers[state][x] for x in ['Biden', 'Trump', 'Benford\'s Law']}
-                state_county_leading_numbers[state]['Benford\'s Law'] = S_BENFORDS
-                p = plot_combined_counts(state_county_leading_numbers[state], biden_v_trump)
-                title = '{} 2020 Election {} by County, Vote Count - {:,}, Size - {:,}'.format(
-                    state,
+                    nationwide_leading_numbers = {x : nationwide_leading_numbers[x] for x in ['Biden', 'Trump', 'Benford\'s Law']}
+                title = 'All votes 2020 Election {} by County, Vote Count - {:,}, Size - {:,}'.format(
                     caption,
-                    state_county_totals[state],
-                    state_county_leading_nums_totals[state]
+                    nationwide_totals,
+                    nationwide_leading_nums_totals
+                )
+                plot_combined_counts(
+                    nationwide_leading_numbers,
+                    biden_v_trump,
+                    title,
+                    'Nationwide-Counts-by-county-jpgs/Combined '+title+'.jpg'
                 )
-                p.set_title('\n'.join(wrap(title, 60)))
-                set_bl_labels(p)
-                if SAVE_FIGS:
-                    name = 'State-Counts-by-county-jpgs/Combined-Plots/'+title+'.jpg'
-                    save_plot_jpg(name)
 
-    plt.show()
+        if STATE_COUNTY_COUNTS_PLOTS:
+            for state in STATES_TO_RUN:
+                # Plot all 3, and biden v trump
+                for caption, biden_v_trump in [('All Candidates', False), ('Biden v. Trump', True)]:
+                    # If biden_v_trump, reduce to only those 2 candidates
+                    if biden_v_trump:
+                        # If already biden_v_trump, skip
+                        if len(state_county_leading_numbers[state]) == 3:
+                            continue
+                        state_county_leading_numbers[state] = {x : state_county_leading_numbers[state][x] for x in ['Biden', 'Trump', 'Benford\'s Law']}
+                    state_county_leading_numbers[state]['Benford\'s Law'] = BENFORDS
+                    title = '{} 2020 Election {} by County, Vote Count - {:,}, Size - {:,}'.format(
+                        state,
+                        caption,
+                        state_county_hists[state]['totals'][DIGIT_TEST],
+                        int(state_county_hists[state]['counts'][DIGIT_TEST].sum())
+                    )
+                    grid = None
+                    if GRID_PLOTS:
+                        # Panels are titled by state, the grid by the comparison
+                        grid = state_grid(plot_path('State-Counts-by-county-jpgs/Combined-Plots'), 'All States 2020 Election {} by County'.format(caption))
+                        title = '{} Vote Count - {:,}, Size - {:,}'.format(
+                            state,
+                            state_county_hists[state]['totals'][DIGIT_TEST],
+                            int(state_county_hists[state]['counts'][DIGIT_TEST].sum())
+                        )
+                    plot_combined_counts(
+                        state_county_leading_numbers[state],
+                        biden_v_trump,
+                        title,
+                        'State-Counts-by-county-jpgs/Combined-Plots/'+title+'.jpg',
+                        grid
+                    )
+
+        if GRID_PLOTS:
+            render.plot_grids(SAVE_FIGS)
+
+def main():
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.enable(PROFILE_STAGE)
+    if WATCH_FEED:
+        return watch()
+
+    with instrument.stage('ingest'):
+        data = load()
+    run(data)
+
+    if SAVE_FIGS:
+        with instrument.stage('render'):
+            render.flush(RENDER_WORKERS, FAST_RENDER, RENDER_CACHE)
+
+    if RUN_REPORT or PROFILE_STAGE:
+        instrument.finish(RUN_REPORT)
+
+    if SHOW_PLOTS:
+        render.show()
 
 if __name__=='__main__':
     main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import argparse
+import importlib.util
+import matplotlib
+
+matplotlib.use('Agg')
+from benford import instrument, render
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Directory of each dataset's main.py, and the plot flag of each of its groupings
+DATASETS = {
+    'nationwide': ('.', {
+        'nationwide': 'NATIONWIDE_COUNTS_PLOTS',
+        'states': 'STATE_COUNTY_COUNTS_PLOTS',
+        'state-totals': 'STATE_COUNTS_PLOTS',
+    }),
+    'georgia': ('Georgia-Election', {
+        'votetype': 'VOTETYPE_PLOTS',
+        'non-presidential': 'EXTRA_PLOTS',
+    }),
+    'pennsylvania': ('Pennsylvania-Election', {
+        'mail': 'MAIL_PLOTS',
+        'provisional': 'PROVISIONAL_PLOTS',
+    }),
+}
+DIGIT_TESTS = {'first': True, 'second': False}
+TESTS = list(DIGIT_TESTS) + ['final']
+GROUPINGS = sorted({g for _, flags in DATASETS.values() for g in flags})
+
+def load_script(dataset):
+    path = os.path.join(ROOT, DATASETS[dataset][0], 'main.py')
+    spec = importlib.util.spec_from_file_location('{}_main'.format(dataset), path)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    return script
+
+def run_dataset(dataset, tests, groupings=None, stats=True, bands=True, draws=None, rerender=False):
+    script = load_script(dataset)
+    directory, flags = DATASETS[dataset]
+    # Groupings not asked for are turned off, all of them run with the script's defaults if None
+    if groupings is not None:
+        for grouping, flag in flags.items():
+            setattr(script, flag, grouping in groupings)
+    script.SAVE_FIGS = True
+    script.PRINT_STATS = stats
+    script.CONFIDENCE_BANDS = bands
+    if rerender:
+        script.RENDER_CACHE = False
+    if draws:
+        script.SIMULATION_DRAWS = draws
+
+    digit_tests = [t for t in tests if t in DIGIT_TESTS]
+    if 'final' in tests and not hasattr(script, 'FINAL_DIGITS_TEST'):
+        print('No final digits test for {}, skipping it'.format(dataset))
+    elif not digit_tests:
+        # Final digits are counted along with a digit test
+        digit_tests = ['first' if script.FIRST_DIGIT_TEST else 'second']
+
+    cwd = os.getcwd()
+    os.chdir(os.path.join(ROOT, directory))
+    try:
+        # Parse once, then count and plot every test from the same data
+        with instrument.stage('ingest'):
+            data = script.load(stream=False) if dataset == 'georgia' else script.load()
+        for i, test in enumerate(digit_tests):
+            print('{} - {} digit test'.format(dataset, test))
+            script.set_digit_test(DIGIT_TESTS[test])
+            if hasattr(script, 'FINAL_DIGITS_TEST'):
+                # Final digits don't depend on the digit test, so only count them once
+                script.FINAL_DIGITS_TEST = 'final' in tests and i == 0
+            script.run(data)
+        with instrument.stage('render'):
+            render.flush(script.RENDER_WORKERS, script.FAST_RENDER, script.RENDER_CACHE)
+    finally:
+        os.chdir(cwd)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run every requested test and grouping of each dataset, loading each dataset once')
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--tests', nargs='+', choices=TESTS, default=TESTS)
+    parser.add_argument('--groupings', nargs='+', choices=GROUPINGS, help='Plot only these groupings (default: each script\'s own settings)')
+    parser.add_argument('--no-stats', action='store_true', help='Don\'t print conformity statistics')
+    parser.add_argument('--no-bands', action='store_true', help='Don\'t draw Monte Carlo bands or print Monte Carlo p-values')
+    parser.add_argument('--rerender', action='store_true', help='Redo every jpg, even those whose plot hasn\'t changed')
+    parser.add_argument('--draws', type=int, help='Simulated samples per sample size')
+    parser.add_argument('--report', help='Write stage timings, counters and peak memory of the run as json to this path')
+    parser.add_argument('--profile', choices=instrument.STAGES, help='cProfile one stage and print its hot spots')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.report or args.profile:
+        instrument.enable(args.profile)
+    for dataset in args.datasets:
+        run_dataset(dataset, args.tests, args.groupings, not args.no_stats, not args.no_bands, args.draws, args.rerender)
+    if args.report or args.profile:
+        instrument.finish(args.report)
+
+if __name__=='__main__':
+    main(sys.argv[1:])
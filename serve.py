@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import time
+import argparse
+from urllib.parse import parse_qsl
+from wsgiref.simple_server import make_server
+from benford import query, render, simulate
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Loaded index and result caches, set by main()
+SERVICE = {}
+
+def respond(start_response, status, body, content_type='application/json'):
+    if content_type == 'application/json':
+        body = json.dumps(body, indent=1).encode()
+    start_response(status, [('Content-Type', content_type), ('Content-Length', str(len(body)))])
+    return [body]
+
+def result(dataset, params):
+    key = query.normalize(dataset, params)
+    return query.cached(SERVICE['results'], key, lambda: query.query(SERVICE['index'], *key))
+
+def image(dataset, params):
+    key = query.normalize(dataset, params)
+    return query.cached(SERVICE['images'], key, lambda: render.png(query.result_spec(result(dataset, params))))
+
+def app(environ, start_response):
+    # GET /              values every dataset can be queried by
+    # GET /<dataset>     histogram and statistics as json, filtered by query parameters
+    # GET /<dataset>.png the same result plotted
+    # GET /cache         hits, misses and evictions of both caches, and simulations kept
+    path = environ.get('PATH_INFO', '/').strip('/')
+    params = dict(parse_qsl(environ.get('QUERY_STRING', '')))
+    start = time.perf_counter()
+    try:
+        if not path:
+            return respond(start_response, '200 OK', query.values(SERVICE['index']))
+        if path == 'cache':
+            return respond(start_response, '200 OK', {
+                'results': query.cache_stats(SERVICE['results']),
+                'images': query.cache_stats(SERVICE['images']),
+                'simulations': {'size': len(simulate._simulations), 'max': simulate.MAX_SIMULATIONS},
+            })
+        if path.endswith('.png'):
+            return respond(start_response, '200 OK', image(path[:-len('.png')], params), 'image/png')
+        r = dict(result(path, params))
+        r['milliseconds'] = (time.perf_counter() - start) * 1000
+        return respond(start_response, '200 OK', r)
+    except Exception as e:
+        return respond(start_response, '400 Bad Request', {'error': str(e)})
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Answer digit test queries over every dataset from memory, loading each dataset once')
+    for dataset, (path, _) in query.SOURCES.items():
+        parser.add_argument('--{}'.format(dataset), default=os.path.join(ROOT, path), help='Path of the {} dataset'.format(dataset))
+    parser.add_argument('--datasets', nargs='+', choices=list(query.SOURCES), default=list(query.SOURCES))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--results', type=int, default=1024, help='Query results kept in the LRU cache')
+    parser.add_argument('--images', type=int, default=128, help='Rendered pngs kept in the LRU cache')
+    parser.add_argument('--simulations', type=int, default=64, help='Monte Carlo simulations kept in memory for queries with draws')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every dataset instead of reading .benford-cache/')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    SERVICE['index'] = query.build_index({d: getattr(args, d) for d in args.datasets}, not args.no_cache)
+    SERVICE['results'] = query.lru(args.results)
+    SERVICE['images'] = query.lru(args.images)
+    simulate.MAX_SIMULATIONS = args.simulations
+    print('Loaded {} in {:.2f}s, serving on http://{}:{}/'.format(
+        ', '.join(args.datasets), time.perf_counter() - start, args.host, args.port
+    ))
+    # One request at a time, matplotlib figures are not thread safe
+    with make_server(args.host, args.port, app) as server:
+        server.serve_forever()
+
+if __name__=='__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from benford import permutation, reference, stats
+
+def test_compare_odd_degrees_of_freedom():
+    # Second digit rows use all 10 digits, 9 degrees of freedom
+    expected = reference.probabilities('second')
+    a = np.rint(expected * 500).astype(np.int64)
+    b = np.r_[300, np.full(9, 10)]
+    r = permutation.compare([a, a], [a, b], 500)
+    assert r['p_value'][0] == pytest.approx(1)
+    assert r['p_value'][1] == pytest.approx(stats.chi2_sf(r['chi2'][1], 9))
+    assert r['permutation_p'][0] > 0.5
+    assert r['permutation_p'][1] < 0.01
+
+def test_compare_mixed_degrees_of_freedom():
+    a = np.array([[10, 20, 30, 0], [5, 5, 0, 0], [0, 0, 0, 0]])
+    b = np.array([[12, 18, 25, 5], [6, 4, 0, 0], [1, 2, 3, 4]])
+    r = permutation.compare(a, b, 200)
+    assert r['p_value'][0] == pytest.approx(stats.chi2_sf(r['chi2'][0], 3))
+    assert r['p_value'][1] == pytest.approx(stats.chi2_sf(r['chi2'][1], 1))
+    assert np.isnan(r['p_value'][2]) and np.isnan(r['permutation_p'][2])
+
+def test_nulls_are_bounded(monkeypatch):
+    monkeypatch.setattr(permutation, 'MAX_NULLS', 2)
+    monkeypatch.setattr(permutation, '_nulls', {})
+    for n_a in (3, 4, 5, 3):
+        permutation.permuted(np.array([4, 4, 4]), n_a, 100)
+    assert [key[1] for key in permutation._nulls] == [5, 3]
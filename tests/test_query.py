@@ -0,0 +1,29 @@
+import numpy as np
+from benford import query
+
+def detail_tables():
+    # Two regions, one contest, Clarity's choice spellings
+    return {'detail': {
+        'columns': {
+            'contest': np.zeros(4, dtype=np.int64),
+            'choice': np.array([0, 0, 1, 1]),
+            'vote_type': np.array([0, 1, 0, 1]),
+            'region': np.array([0, 1, 0, 1]),
+            'votes': np.array([120, 340, 56, 78]),
+        },
+        'labels': {
+            'contest': ['President of the United States'],
+            'choice': ['Donald J. Trump (I) (Rep)', 'Joseph R. Biden (Dem)'],
+            'vote_type': ['Election Day Votes', 'Absentee by Mail Votes'],
+            'region': ['Appling', 'Bacon'],
+        },
+    }}
+
+def test_georgia_candidates_match_by_last_name():
+    index = {'georgia': query.georgia_groups(detail_tables())}
+    assert query.values(index)['georgia']['candidate'] == ['Biden', 'Trump']
+    r = query.query(index, *query.normalize('georgia', {'candidate': 'trump'}))
+    assert r['filters']['candidate'] == 'Trump'
+    assert r['votes'] == 460
+    r = query.query(index, *query.normalize('georgia', {'candidate': 'TRUMP', 'vote_type': 'absentee by mail votes'}))
+    assert r['votes'] == 340
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from benford import reference, stats
+
+# Chi-square critical values at p = 0.05 and p = 0.01
+CRITICAL = [
+    (1, 3.841, 0.05), (2, 5.991, 0.05), (8, 15.507, 0.05), (9, 16.919, 0.05),
+    (8, 20.090, 0.01), (9, 21.666, 0.01), (89, 112.022, 0.05),
+]
+
+@pytest.mark.parametrize('df, x, p', CRITICAL)
+def test_chi2_sf_scalar(df, x, p):
+    assert float(stats.chi2_sf(x, df)) == pytest.approx(p, abs=1e-4)
+
+@pytest.mark.parametrize('df', [1, 2, 8, 9])
+def test_chi2_sf_array(df):
+    x = np.array([[0.0, [c for d, c, p in CRITICAL if d == df][0]]])
+    p = stats.chi2_sf(x, df)
+    assert p.shape == x.shape
+    assert p[0, 0] == 1
+    assert p[0, 1] == pytest.approx(0.05, abs=1e-4)
+
+def benford_counts(test, n):
+    return np.rint(reference.probabilities(test) * n)
+
+def test_conformity_of_benford_counts():
+    r = stats.conformity(benford_counts('first', 100000), 'first')
+    assert r['chi2'][0] < 0.01
+    assert r['p_value'][0] > 0.99
+    assert r['mad_class'][0] == 'Close conformity'
+    assert r['ks'][0] < r['ks_critical'][0]
+    assert np.all(r['z'][0] < 1.96)
+
+def test_conformity_of_uniform_counts():
+    r = stats.conformity(np.full(9, 1000), 'first')
+    assert r['p_value'][0] < 1e-10
+    assert r['mad_class'][0] == 'Nonconformity'
+    assert r['ks'][0] > r['ks_critical'][0]
+    # Ones are far less common than Benford's law expects
+    assert r['z'][0][0] > 10
+
+def test_conformity_rows_and_empty_row():
+    counts = np.vstack([benford_counts('second', 10000), np.zeros(10)])
+    r = stats.conformity(counts, 'second')
+    assert r['n'].tolist() == [counts[0].sum(), 0]
+    assert r['p_value'][0] > 0.99
+    assert np.isnan(r['p_value'][1])
+    assert r['mad_class'].tolist() == ['Close conformity', 'n/a']
+
+def test_mad_class_boundaries():
+    expected = reference.probabilities('first')
+    n = 10 ** 9
+    for mad, name in [(0.005, 'Close conformity'), (0.010, 'Acceptable conformity'), (0.014, 'Marginal conformity'), (0.02, 'Nonconformity')]:
+        # Shift mad from every digit but the first, onto the first
+        counts = np.rint((expected + mad * np.r_[8, -np.ones(8)] * 9 / 16) * n)
+        assert stats.conformity(counts, 'first')['mad_class'][0] == name
+
+def test_mad_class_without_ranges():
+    assert stats.conformity(benford_counts('last', 10000), 'last')['mad_class'][0] == 'n/a'